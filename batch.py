@@ -0,0 +1,54 @@
+"""
+CLI entry point for running many commission calculations as one batch.
+"""
+import argparse
+import sys
+import time
+
+from src.batch_runner import load_manifest, run_batch, save_summary
+from src.utils import positive_int
+
+def main():
+    """
+    Main function to run a batch of commission calculations.
+    """
+    parser = argparse.ArgumentParser(description="MLM Commission Engine - batch runner")
+    parser.add_argument(
+        "--manifest", required=True, help="Path to the batch manifest JSON file."
+    )
+    parser.add_argument(
+        "--summary", required=True, help="Path to the output batch summary JSON file."
+    )
+    parser.add_argument(
+        "--workers",
+        type=positive_int,
+        help="Number of worker processes (at least 1). Defaults to the number of CPU cores.",
+    )
+    args = parser.parse_args()
+
+    try:
+        jobs = load_manifest(args.manifest)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"An error occurred: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    start_time = time.perf_counter()
+    results = run_batch(jobs, max_workers=args.workers)
+    total_seconds = time.perf_counter() - start_time
+
+    save_summary(args.summary, results, total_seconds)
+
+    failed = [r for r in results if not r.ok]
+    for result in failed:
+        print(f"Job '{result.input}' failed: {result.error}", file=sys.stderr)
+
+    print(
+        f"Completed {len(results) - len(failed)} of {len(results)} jobs in {total_seconds:.2f}s. "
+        f"Summary saved to '{args.summary}'"
+    )
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+CLI entry point for calculating commissions from a partner event log.
+"""
+import argparse
+import sys
+
+from src.data_loader import save_commissions
+from src.event_log import EventLogIngester
+from src.utils import get_days_in_month, parse_month, positive_int
+
+def main():
+    """
+    Main function to apply a partner event log and calculate commissions.
+    """
+    parser = argparse.ArgumentParser(description="MLM Commission Engine - event log ingester")
+    parser.add_argument(
+        "--log", required=True, help="Path to the NDJSON partner event log."
+    )
+    parser.add_argument(
+        "--checkpoint", required=True, help="Path to the checkpoint file to restore from and update."
+    )
+    parser.add_argument(
+        "--output", required=True, help="Path to the output commissions JSON file."
+    )
+    parser.add_argument(
+        "--month",
+        help="The month for which to calculate commissions (YYYY-MM). Defaults to the current month.",
+    )
+    parser.add_argument(
+        "--checkpoint-interval",
+        type=positive_int,
+        default=10000,
+        help="Number of events between automatic checkpoints (at least 1).",
+    )
+    args = parser.parse_args()
+
+    try:
+        year, month = parse_month(args.month)
+        days_in_month = get_days_in_month(year, month)
+
+        ingester = EventLogIngester(
+            args.log, args.checkpoint, days_in_month, checkpoint_interval=args.checkpoint_interval
+        )
+        replayed = ingester.recover()
+        ingester.checkpoint()
+
+        save_commissions(args.output, ingester.calculate_commissions())
+
+        print(
+            f"Replayed {replayed} events and saved commissions for {year}-{month:02d} to '{args.output}'"
+        )
+
+    except (FileNotFoundError, ValueError) as e:
+        print(f"An error occurred: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
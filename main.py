@@ -2,15 +2,13 @@
 CLI entry point for the MLM Commission Engine.
 """
 import argparse
-import json
 import sys
-import os
-from datetime import datetime
 
-from src.data_loader import load_partners
+from src.data_loader import load_partners_parallel, save_commissions
 from src.tree_validator import validate_hierarchy
 from src.commission_engine import CommissionCalculator
-from src.utils import get_days_in_month, get_current_year_month
+from src.attribution import CommissionAttributor
+from src.utils import get_days_in_month, parse_month
 
 def main():
     """
@@ -27,32 +25,26 @@ def main():
         "--month",
         help="The month for which to calculate commissions (YYYY-MM). Defaults to the current month.",
     )
+    parser.add_argument(
+        "--attribution",
+        help="Optional path to an NDJSON file with each partner's per-leg and per-level commission breakdown.",
+    )
     args = parser.parse_args()
 
     try:
-        if args.month:
-            try:
-                year, month = map(int, args.month.split("-"))
-            except ValueError:
-                raise ValueError("Invalid month format. Please use YYYY-MM.")
-        else:
-            year, month = get_current_year_month()
-
+        year, month = parse_month(args.month)
         days_in_month = get_days_in_month(year, month)
 
-        partners = load_partners(args.input)
-        validate_hierarchy(partners)
+        partners = load_partners_parallel(args.input)
+        hierarchy = validate_hierarchy(partners)
 
-        calculator = CommissionCalculator(partners, days_in_month)
+        calculator = CommissionCalculator(partners, days_in_month, hierarchy=hierarchy)
         commissions = calculator.calculate_commissions()
 
-        # Ensure the output directory exists
-        output_dir = os.path.dirname(args.output)
-        if output_dir:
-            os.makedirs(output_dir, exist_ok=True)
+        save_commissions(args.output, commissions)
 
-        with open(args.output, 'w', encoding='utf-8') as f:
-            json.dump(commissions, f, indent=2)
+        if args.attribution:
+            CommissionAttributor(calculator).stream(args.attribution)
 
         print(f"Successfully calculated commissions for {year}-{month:02d} and saved to '{args.output}'")
 
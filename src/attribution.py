@@ -0,0 +1,225 @@
+"""
+Breaks a partner's commission down by first-level leg and by depth level.
+"""
+import json
+import os
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, List
+
+from .commission_engine import CommissionCalculator, compute_commission, differential_leg
+from .id_codec import PartnerId, NO_PARENT
+
+@dataclass(frozen=True, slots=True)
+class Attribution:
+    """
+    Where a partner's commission came from.
+
+    Leg and level amounts are rounded individually, so they can differ from
+    the commission by a few cents in total.
+
+    Attributes:
+        partner_id: The partner being explained.
+        commission: The partner's commission.
+        legs: Direct downline partner id to the commission earned on their whole subtree.
+        levels: Commission earned per depth level, starting with the direct downline.
+    """
+    partner_id: PartnerId
+    commission: float
+    legs: Dict[PartnerId, float]
+    levels: List[float]
+
+class CommissionAttributor:
+    """
+    Explains commissions from a calculator's memoized subtree totals.
+
+    Expanding every partner's downline would cost O(n * depth). Instead, leg
+    amounts come straight from the children's memoized totals, and level amounts
+    from an O(n) index: partners are numbered in DFS preorder, so each subtree
+    is a contiguous range of numbers, and per-depth prefix sums of revenue give
+    any subtree's revenue at a given depth with two binary searches.
+
+    Under a differential plan, leg amounts come from the engine's per-tier
+    buckets of each child, in the same float operations as the payout itself.
+    Level amounts depend on the ranks along every path below a partner, so they
+    come from walking the downline, stopping at the first leader ranked at or
+    above them.
+    """
+
+    def __init__(self, calculator: CommissionCalculator):
+        self._calculator = calculator
+        self._codec = calculator.codec
+        self._totals = calculator.subtree_totals()
+        self._revenues = calculator.revenues
+        if calculator.differential:
+            self._tiers, self._buckets = calculator.differential_state()
+        self._build_index(calculator)
+
+    def _build_index(self, calculator: CommissionCalculator) -> None:
+        """
+        Numbers partners in preorder and builds per-depth revenue prefix sums.
+
+        Every column is a flat array('q') or array('d'), so the index costs a
+        few machine words per partner rather than boxed ints and floats.
+        """
+        size = len(self._totals)
+        self._order = array('q', [-1]) * size
+        self._end = array('q', [-1]) * size
+        self._depth = array('q', [0]) * size
+        self._preorder = array('q')
+        self._positions: List[array] = []
+        self._prefix_sums: List[array] = []
+
+        preorder = self._preorder
+        parents = calculator.parents
+        roots = [index for index in calculator.active_indices() if parents[index] == NO_PARENT]
+        stack = [(root, 0) for root in reversed(roots)]
+        while stack:
+            index, depth = stack.pop()
+            self._order[index] = len(preorder)
+            self._depth[index] = depth
+            preorder.append(index)
+            if depth == len(self._positions):
+                self._positions.append(array('q'))
+                self._prefix_sums.append(array('d', [0.0]))
+            self._positions[depth].append(self._order[index])
+            prefix = self._prefix_sums[depth]
+            prefix.append(prefix[-1] + self._revenues[index])
+            for child in reversed(calculator.children(index)):
+                stack.append((child, depth + 1))
+
+        # A subtree ends where its last descendant in preorder ends.
+        for index in reversed(preorder):
+            end = self._order[index] + 1
+            for child in calculator.children(index):
+                end = max(end, self._end[child])
+            self._end[index] = end
+
+    def explain(self, partner_id: PartnerId) -> Attribution:
+        """
+        Returns the per-leg and per-level breakdown of a partner's commission.
+
+        Raises:
+            ValueError: If the partner is unknown.
+        """
+        return self._explain(self._codec.encode(partner_id))
+
+    def stream(self, file_path: str) -> int:
+        """
+        Writes every partner's breakdown to an NDJSON file, one partner per line.
+
+        Only one breakdown is held in memory at a time.
+
+        Args:
+            file_path: The path to the output NDJSON file.
+
+        Returns:
+            The number of partners written.
+        """
+        output_dir = os.path.dirname(file_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        count = 0
+        with open(file_path, 'w', encoding='utf-8') as f:
+            for index in self._preorder:
+                attribution = self._explain(index)
+                f.write(json.dumps({
+                    "partner_id": attribution.partner_id,
+                    "commission": attribution.commission,
+                    "legs": attribution.legs,
+                    "levels": attribution.levels,
+                }))
+                f.write("\n")
+                count += 1
+        return count
+
+    def _explain(self, index: int) -> Attribution:
+        """Builds the breakdown for a partner index, translating ids on the way out."""
+        if self._calculator.differential:
+            return self._explain_differential(index)
+
+        days_in_month = self._calculator.days_in_month
+        children = self._calculator.children(index)
+        descendants_revenue = 0
+        for child in children:
+            descendants_revenue += self._totals[child]
+        rate = self._calculator.rate_for_volume(descendants_revenue)
+
+        decode = self._codec.decode
+        legs = {
+            decode(child): compute_commission(self._totals[child], days_in_month, rate)
+            for child in children
+        }
+        levels = [
+            compute_commission(revenue, days_in_month, rate)
+            for revenue in self._level_revenues(index)
+        ]
+        return Attribution(
+            partner_id=decode(index),
+            commission=compute_commission(descendants_revenue, days_in_month, rate),
+            legs=legs,
+            levels=levels,
+        )
+
+    def _level_revenues(self, index: int) -> List[float]:
+        """Returns the downline revenue at each depth below a partner, from the index."""
+        start = self._order[index] + 1
+        end = self._end[index]
+        revenues = []
+        depth = self._depth[index] + 1
+        while depth < len(self._positions):
+            positions = self._positions[depth]
+            lo = bisect_left(positions, start)
+            hi = bisect_left(positions, end)
+            if lo == hi:
+                break
+            prefix = self._prefix_sums[depth]
+            revenues.append(prefix[hi] - prefix[lo])
+            depth += 1
+        return revenues
+
+    def _explain_differential(self, index: int) -> Attribution:
+        """
+        Explains a differential-plan commission from the engine's tiers and buckets.
+
+        Leg amounts are the engine's own per-child payout steps, so the
+        commission always equals the calculated one.
+        """
+        days_in_month = self._calculator.days_in_month
+        tier_rates = self._calculator.tier_rates
+        stride = len(tier_rates)
+        tier = self._tiers[index]
+        rate = tier_rates[tier]
+
+        children = self._calculator.children(index)
+        legs: Dict[int, float] = {}
+        amount = 0.0
+        scratch = [0.0] * stride
+        for child in children:
+            child_buckets = self._buckets[child * stride:(child + 1) * stride]
+            legs[child] = differential_leg(tier, tier_rates, self._revenues[child], child_buckets, scratch)
+            amount += legs[child]
+
+        # Each entry is (partner, level, highest rate already paid above it).
+        levels: List[float] = []
+        stack = [(child, 0, 0.0) for child in children]
+        while stack:
+            current, level, paid_rate = stack.pop()
+            while len(levels) <= level:
+                levels.append(0.0)
+            levels[level] += (rate - paid_rate) * self._revenues[current]
+
+            paid_rate = max(paid_rate, tier_rates[self._tiers[current]])
+            if paid_rate < rate:
+                for child in self._calculator.children(current):
+                    stack.append((child, level + 1, paid_rate))
+
+        decode = self._codec.decode
+        return Attribution(
+            partner_id=decode(index),
+            commission=round(amount / days_in_month, 2),
+            legs={decode(leg): round(earned / days_in_month, 2) for leg, earned in legs.items()},
+            levels=[round(earned / days_in_month, 2) for earned in levels],
+        )
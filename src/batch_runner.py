@@ -0,0 +1,264 @@
+"""
+Runs many commission calculations in a single batch on a pool of worker processes.
+"""
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, asdict
+from typing import Deque, List
+
+from .data_loader import load_partners, save_commissions
+from .tree_validator import validate_hierarchy
+from .commission_engine import CommissionCalculator
+from .utils import get_days_in_month, parse_month
+
+@dataclass(frozen=True, slots=True)
+class BatchJob:
+    """
+    A single commission calculation described by a batch manifest entry.
+
+    Attributes:
+        input: The path to the input partners JSON file.
+        output: The path to the output commissions JSON file.
+        month: The month to calculate (YYYY-MM), or None for the current month.
+    """
+    input: str
+    output: str
+    month: str | None = None
+
+@dataclass(frozen=True, slots=True)
+class JobResult:
+    """
+    The outcome of running a single batch job.
+
+    Attributes:
+        input: The input path of the job.
+        output: The output path of the job.
+        ok: Whether the job completed successfully.
+        elapsed_seconds: Wall-clock time spent on the job.
+        num_partners: The number of partners processed, or 0 if loading failed.
+        error: The error message for a failed job, otherwise None.
+    """
+    input: str
+    output: str
+    ok: bool
+    elapsed_seconds: float
+    num_partners: int = 0
+    error: str | None = None
+
+def load_manifest(file_path: str) -> List[BatchJob]:
+    """
+    Loads a batch manifest from a JSON file.
+
+    The manifest is a list of objects with "input", "output" and an optional
+    "month" key. Relative paths are resolved against the manifest's directory.
+
+    Args:
+        file_path: The path to the manifest JSON file.
+
+    Returns:
+        A list of BatchJob objects in manifest order.
+
+    Raises:
+        FileNotFoundError: If the manifest file is not found.
+        ValueError: If the JSON is malformed or an entry is invalid.
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Error: Manifest file not found at '{file_path}'")
+    except json.JSONDecodeError:
+        raise ValueError(f"Error: Malformed JSON in '{file_path}'")
+
+    if not isinstance(data, list):
+        raise ValueError("Error: Manifest JSON must be a list of job objects.")
+
+    base_dir = os.path.dirname(os.path.abspath(file_path))
+    jobs = []
+    for item in data:
+        try:
+            jobs.append(BatchJob(
+                input=os.path.join(base_dir, item['input']),
+                output=os.path.join(base_dir, item['output']),
+                month=item.get('month'),
+            ))
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"Invalid job entry in manifest: {item}. Missing or invalid key: {e}")
+    return jobs
+
+def run_job(job: BatchJob) -> JobResult:
+    """
+    Runs a single job end to end: load, validate, calculate and save.
+
+    Failures are captured in the returned result rather than raised, so one
+    bad input never aborts the rest of the batch.
+
+    Args:
+        job: The job to run.
+
+    Returns:
+        The JobResult describing the outcome.
+    """
+    start_time = time.perf_counter()
+    num_partners = 0
+    try:
+        year, month = parse_month(job.month)
+        days_in_month = get_days_in_month(year, month)
+
+        partners = load_partners(job.input)
+        num_partners = len(partners)
+        hierarchy = validate_hierarchy(partners)
+
+        calculator = CommissionCalculator(partners, days_in_month, hierarchy=hierarchy)
+        save_commissions(job.output, calculator.calculate_commissions())
+    except Exception as e:
+        return JobResult(
+            input=job.input,
+            output=job.output,
+            ok=False,
+            elapsed_seconds=time.perf_counter() - start_time,
+            num_partners=num_partners,
+            error=_format_error(e),
+        )
+
+    return JobResult(
+        input=job.input,
+        output=job.output,
+        ok=True,
+        elapsed_seconds=time.perf_counter() - start_time,
+        num_partners=num_partners,
+    )
+
+def run_batch(jobs: List[BatchJob], max_workers: int | None = None) -> List[JobResult]:
+    """
+    Runs all jobs on a pool of long-lived worker processes.
+
+    Jobs are submitted largest input first so that the biggest files do not
+    end up as stragglers at the end of the batch.
+
+    If a worker process dies (e.g. killed by the OS), the pool is lost along
+    with every job running on it. Those jobs are re-run, each in its own
+    single-worker pool, so only the job that actually kills its worker is
+    recorded as failed; the jobs not started yet continue on a new pool.
+
+    Args:
+        jobs: The jobs to run.
+        max_workers: The number of worker processes. Defaults to the CPU count.
+
+    Returns:
+        A list of JobResult objects in the same order as the jobs.
+
+    Raises:
+        ValueError: If max_workers is less than 1.
+    """
+    if max_workers is not None and max_workers < 1:
+        raise ValueError("Error: The number of workers must be at least 1.")
+    if not jobs:
+        return []
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    pending = deque(sorted(range(len(jobs)), key=lambda i: _input_size(jobs[i]), reverse=True))
+    results: List[JobResult | None] = [None] * len(jobs)
+
+    while pending:
+        suspects = _run_on_pool(jobs, pending, results, max_workers)
+        if suspects:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(suspects))) as threads:
+                isolated = threads.map(lambda i: _run_isolated(jobs[i]), suspects)
+                for index, result in zip(suspects, isolated):
+                    results[index] = result
+    return results
+
+def _run_on_pool(
+    jobs: List[BatchJob], pending: Deque[int], results: List[JobResult | None], max_workers: int
+) -> List[int]:
+    """
+    Runs pending jobs on one pool, keeping at most max_workers jobs in flight.
+
+    Only as many jobs as there are workers are submitted at a time, so when the
+    pool breaks the jobs in flight are exactly the ones that were running.
+
+    Returns:
+        The indices of the jobs that were running when the pool broke, or an
+        empty list if every pending job finished.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = {}
+        while pending or in_flight:
+            while pending and len(in_flight) < max_workers:
+                index = pending.popleft()
+                in_flight[executor.submit(run_job, jobs[index])] = index
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            broken = []
+            for future in done:
+                index = in_flight.pop(future)
+                try:
+                    results[index] = future.result()
+                except BrokenProcessPool:
+                    broken.append(index)
+                except Exception as e:
+                    results[index] = _failed_result(jobs[index], 0.0, e)
+            if broken:
+                return broken + list(in_flight.values())
+    return []
+
+def _run_isolated(job: BatchJob) -> JobResult:
+    """Runs a job on its own single-worker pool, so a crash only affects this job."""
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        try:
+            return executor.submit(run_job, job).result()
+        except Exception as e:
+            # The worker itself died (e.g. killed by the OS), not just the job.
+            return _failed_result(job, time.perf_counter() - start_time, e)
+
+def _failed_result(job: BatchJob, elapsed_seconds: float, error: Exception) -> JobResult:
+    """Builds the result for a job whose worker failed."""
+    return JobResult(
+        input=job.input,
+        output=job.output,
+        ok=False,
+        elapsed_seconds=elapsed_seconds,
+        error=_format_error(error),
+    )
+
+def save_summary(file_path: str, results: List[JobResult], total_seconds: float) -> None:
+    """
+    Writes a batch summary with per-job timings and errors to a JSON file.
+
+    Args:
+        file_path: The path to the summary JSON file.
+        results: The job results to report.
+        total_seconds: Wall-clock time for the whole batch.
+    """
+    summary = {
+        "total_seconds": round(total_seconds, 4),
+        "succeeded": sum(1 for r in results if r.ok),
+        "failed": sum(1 for r in results if not r.ok),
+        "jobs": [asdict(r) for r in results],
+    }
+
+    output_dir = os.path.dirname(file_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+
+def _input_size(job: BatchJob) -> int:
+    """Returns the input file size in bytes, or 0 if it cannot be read."""
+    try:
+        return os.path.getsize(job.input)
+    except OSError:
+        return 0
+
+def _format_error(error: Exception) -> str:
+    """Formats an exception for the batch summary."""
+    if isinstance(error, (FileNotFoundError, ValueError)):
+        return str(error)
+    return f"{type(error).__name__}: {error}"
@@ -1,75 +1,485 @@
 """
 Core commission calculation engine.
 """
-from typing import List, Dict
-from .data_loader import Partner
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass
+from math import isnan, nan
+from typing import List, Dict, MutableSequence, Sequence, Tuple
+from .data_loader import Partner, index_partners
+from .id_codec import IdCodec, PartnerId, NO_PARENT
 
 COMMISSION_RATE = 0.05
 
+# Shared by every partner without a downline; replaced by an array on the first child.
+_NO_CHILDREN: Sequence[int] = ()
+
+@dataclass(frozen=True, slots=True)
+class RankTier:
+    """
+    A rank in a volume-based commission plan.
+
+    Attributes:
+        min_volume: The minimum monthly downline revenue needed to reach the rank.
+        rate: The commission rate earned at this rank.
+    """
+    min_volume: float
+    rate: float
+
+def compute_commission(descendants_revenue: float, days_in_month: int, rate: float = COMMISSION_RATE) -> float:
+    """Returns the rounded daily commission earned on a downline's monthly revenue."""
+    return round(descendants_revenue / days_in_month * rate, 2)
+
+def differential_leg(
+    tier: int,
+    tier_rates: Sequence[float],
+    revenue: float,
+    child_buckets: Sequence[float],
+    buckets: MutableSequence[float],
+) -> float:
+    """
+    Pays a partner on one direct leg under the differential rule.
+
+    A partner's buckets hold, per tier, the revenue of their downline on which
+    that tier's rate is the highest rate paid so far, the partner included. The
+    direct child's own revenue is paid at the partner's full rate; downline
+    revenue in each of the child's buckets is paid the amount by which the
+    partner's rate exceeds that bucket's rate, if any.
+
+    Args:
+        tier: The partner's tier index.
+        tier_rates: The rate of each tier index.
+        revenue: The direct child's own monthly revenue.
+        child_buckets: The direct child's buckets.
+        buckets: The partner's buckets, which the leg's revenue is added to.
+
+    Returns:
+        The monthly amount earned on the leg, before dividing by the days in the month.
+    """
+    rate = tier_rates[tier]
+    earned = rate * revenue
+    buckets[tier] += revenue
+    for child_tier, amount in enumerate(child_buckets):
+        if amount:
+            if tier_rates[child_tier] < rate:
+                earned += (rate - tier_rates[child_tier]) * amount
+                buckets[tier] += amount
+            else:
+                buckets[child_tier] += amount
+    return earned
+
 class CommissionCalculator:
     """
     Calculates commissions for all partners in an MLM network.
+
+    By default every partner earns the flat COMMISSION_RATE on their downline.
+    With rank_tiers, each partner's rate is instead set by the tier their own
+    downline volume reaches; partners below the lowest tier earn nothing. With
+    differential=True as well, revenue is paid out up the line so that each
+    upline only earns the difference between their rate and the highest rate
+    already paid on that revenue further down.
+
+    Per-partner numbers live in flat arrays indexed by partner index: revenues
+    and memoized subtree totals as array('d'), parent indices and each
+    partner's children as array('q'). Partner objects are not kept; only the
+    names are, so that the partners property can rebuild them for checkpoints.
     """
 
-    def __init__(self, partners: List[Partner], days_in_month: int):
-        self._partners_map: Dict[int, Partner] = {p.id: p for p in partners}
+    def __init__(
+        self,
+        partners: List[Partner],
+        days_in_month: int,
+        rank_tiers: List[RankTier] | None = None,
+        differential: bool = False,
+        hierarchy: Tuple[IdCodec, array] | None = None,
+    ):
+        """
+        Args:
+            partners: A list of Partner objects.
+            days_in_month: The number of days the monthly revenue is spread over.
+            rank_tiers: The rank tiers of a volume-based plan, or None for the flat rate.
+            differential: Whether uplines are paid the rate difference over their downline.
+            hierarchy: The (codec, parent indices) pair for these partners, as returned by
+                validate_hierarchy, so it is not built a second time. The calculator takes
+                ownership of it and updates it as partners change.
+
+        Raises:
+            ValueError: If the plan is invalid, the hierarchy is invalid, or a monthly
+                revenue is not a number.
+        """
+        if differential and not rank_tiers:
+            raise ValueError("Error: Differential payouts require rank tiers.")
+        if rank_tiers:
+            volumes = [tier.min_volume for tier in rank_tiers]
+            if volumes != sorted(volumes) or len(set(volumes)) != len(volumes):
+                raise ValueError("Error: Rank tiers must have strictly increasing minimum volumes.")
+
+        self._codec, self._parents = hierarchy if hierarchy is not None else index_partners(partners)
+        # None marks a removed partner.
+        self._names: List[str | None] = [p.name for p in partners]
+        self._revenues = _revenue_array(partners)
         self._days_in_month = days_in_month
-        self._adjacency_list = self._build_tree(partners)
-        self._memo: Dict[int, float] = {}
+        self._rank_tiers = list(rank_tiers) if rank_tiers else None
+        self._tier_volumes = [tier.min_volume for tier in self._rank_tiers] if rank_tiers else []
+        # Tier index 0 is "below every tier"; tier i >= 1 is rank_tiers[i - 1].
+        # A flat-rate plan has the single tier 0 at COMMISSION_RATE.
+        self._tier_rates = [0.0] + [tier.rate for tier in self._rank_tiers] if rank_tiers else [COMMISSION_RATE]
+        self._differential = differential
+        self._children = self._build_tree(self._parents)
+        # NaN marks a partner whose subtree total is not memoized.
+        self._memo = array('d', [nan]) * len(partners)
+
+    def _build_tree(self, parents: array) -> List[Sequence[int]]:
+        """Builds the children of each partner index for the partner hierarchy."""
+        children: List[Sequence[int]] = [_NO_CHILDREN] * len(parents)
+        for index, parent in enumerate(parents):
+            if parent != NO_PARENT:
+                if children[parent] is _NO_CHILDREN:
+                    children[parent] = array('q')
+                children[parent].append(index)
+        return children
+
+    def _mutable_children(self, index: int) -> array:
+        """Returns a partner's children as an array that can be modified in place."""
+        if self._children[index] is _NO_CHILDREN:
+            self._children[index] = array('q')
+        return self._children[index]
+
+    @property
+    def partners(self) -> List[Partner]:
+        """The current partners, in insertion order, rebuilt from the calculator's arrays."""
+        decode = self._codec.decode
+        return [
+            Partner(
+                id=decode(index),
+                parent_id=None if self._parents[index] == NO_PARENT else decode(self._parents[index]),
+                name=self._names[index],
+                monthly_revenue=self._revenues[index],
+            )
+            for index in self.active_indices()
+        ]
+
+    @property
+    def codec(self) -> IdCodec:
+        """The mapping between external partner ids and the calculator's indices."""
+        return self._codec
+
+    @property
+    def parents(self) -> array:
+        """The parent index of each partner index, or NO_PARENT. Must not be modified."""
+        return self._parents
+
+    @property
+    def revenues(self) -> array:
+        """The monthly revenue of each partner index. Must not be modified."""
+        return self._revenues
+
+    @property
+    def days_in_month(self) -> int:
+        """The number of days the monthly revenue is spread over."""
+        return self._days_in_month
+
+    @property
+    def rank_tiers(self) -> List[RankTier] | None:
+        """The rank tiers of a volume-based plan, or None for the flat rate."""
+        return self._rank_tiers
+
+    @property
+    def differential(self) -> bool:
+        """Whether uplines are paid the rate difference over their downline."""
+        return self._differential
+
+    def active_indices(self) -> List[int]:
+        """Returns the indices of current partners; removed partners leave gaps."""
+        return [index for index, name in enumerate(self._names) if name is not None]
+
+    def children(self, index: int) -> Sequence[int]:
+        """Returns the indices of a partner's direct downline. The sequence must not be modified."""
+        return self._children[index]
+
+    @property
+    def tier_rates(self) -> List[float]:
+        """
+        The commission rate of each tier index. For ranked plans, tier 0 is below
+        every rank tier and earns nothing, and tier i >= 1 is rank_tiers[i - 1].
+        """
+        return self._tier_rates
+
+    def tier_for_volume(self, volume: float) -> int:
+        """Returns the tier index for a partner with the given downline volume."""
+        return bisect_right(self._tier_volumes, volume)
+
+    def rate_for_volume(self, volume: float) -> float:
+        """Returns the commission rate for a partner with the given downline volume."""
+        return self._tier_rates[bisect_right(self._tier_volumes, volume)]
+
+    def differential_state(self) -> Tuple[List[int], array]:
+        """
+        Returns each partner's tier index and differential buckets, by partner index.
+
+        Partner i's buckets (see differential_leg) are the slice
+        [i * len(tier_rates):(i + 1) * len(tier_rates)] of the returned array.
+        Removed partners have tier 0 and empty buckets.
+        """
+        tiers, buckets, _ = self._differential_pass()
+        return tiers, buckets
+
+    def subtree_totals(self) -> array:
+        """
+        Returns each partner's own revenue plus that of their whole downline,
+        by partner index. Removed partners have NaN.
+
+        The returned array is the calculator's memo and must not be modified.
+        """
+        self._fill_memo()
+        return self._memo
+
+    def add_partner(self, partner: Partner) -> None:
+        """
+        Adds a new partner to the hierarchy.
+
+        Raises:
+            ValueError: If the id already exists or the parent is unknown.
+        """
+        if partner.id in self._codec:
+            raise ValueError(f"Error: Partner {partner.id} already exists")
+        if partner.parent_id is not None and partner.parent_id not in self._codec:
+            raise ValueError(f"Error: Partner {partner.id} has a missing parent with id {partner.parent_id}")
+
+        parent = NO_PARENT if partner.parent_id is None else self._codec.encode(partner.parent_id)
+        revenue = _revenue_array([partner])[0]
+        self._codec.add(partner.id)
+        self._names.append(partner.name)
+        self._revenues.append(revenue)
+        self._parents.append(parent)
+        self._children.append(_NO_CHILDREN)
+        self._memo.append(nan)
+        if parent != NO_PARENT:
+            self._mutable_children(parent).append(len(self._names) - 1)
+            self._invalidate(parent)
+
+    def post_revenue(self, partner_id: PartnerId, amount: float) -> None:
+        """
+        Adds revenue to a partner's monthly revenue.
+
+        Raises:
+            ValueError: If the partner is unknown.
+        """
+        index = self._codec.encode(partner_id)
+        self._revenues[index] += amount
+        self._invalidate(index)
+
+    def change_sponsor(self, partner_id: PartnerId, parent_id: PartnerId | None) -> None:
+        """
+        Moves a partner, together with their downline, under a new parent.
+
+        Raises:
+            ValueError: If either partner is unknown or the move would create a cycle.
+        """
+        index = self._codec.encode(partner_id)
+        parent = NO_PARENT if parent_id is None else self._codec.encode(parent_id)
+        ancestor = parent
+        while ancestor != NO_PARENT:
+            if ancestor == index:
+                raise ValueError(
+                    f"Error: Moving partner {partner_id} under {parent_id} would create a cycle"
+                )
+            ancestor = self._parents[ancestor]
 
-    def _build_tree(self, partners: List[Partner]) -> Dict[int, List[int]]:
-        """Builds an adjacency list for the partner hierarchy."""
-        adj_list: Dict[int, List[int]] = {p.id: [] for p in partners}
-        for p in partners:
-            if p.parent_id is not None:
-                adj_list[p.parent_id].append(p.id)
-        return adj_list
+        self._detach(index)
+        self._parents[index] = parent
+        if parent != NO_PARENT:
+            self._mutable_children(parent).append(index)
+            self._invalidate(parent)
 
-    def _calculate_total_downline_revenue(self, partner_id: int) -> float:
+    def remove_partner(self, partner_id: PartnerId) -> None:
         """
-        Recursively calculates the total revenue from a partner and their downline
-        using post-order traversal and memoization.
+        Removes a partner, rolling their direct downline up to their parent.
+
+        Raises:
+            ValueError: If the partner is unknown.
         """
-        if partner_id in self._memo:
-            return self._memo[partner_id]
+        index = self._codec.encode(partner_id)
+        parent = self._parents[index]
+        self._detach(index)
+
+        children = self._children[index]
+        for child in children:
+            self._parents[child] = parent
+        if parent != NO_PARENT:
+            self._mutable_children(parent).extend(children)
 
-        partner = self._partners_map[partner_id]
-        
-        # Start with the partner's own revenue
-        total_revenue = partner.monthly_revenue
+        self._codec.discard(partner_id)
+        self._names[index] = None
+        self._revenues[index] = 0
+        self._parents[index] = NO_PARENT
+        self._children[index] = _NO_CHILDREN
+        self._memo[index] = nan
 
-        # Add revenue from all children's downlines
-        if partner_id in self._adjacency_list:
-            for child_id in self._adjacency_list[partner_id]:
-                total_revenue += self._calculate_total_downline_revenue(child_id)
+    def _detach(self, index: int) -> None:
+        """Unlinks a partner from their current parent's children."""
+        parent = self._parents[index]
+        if parent != NO_PARENT:
+            self._children[parent].remove(index)
+            self._invalidate(parent)
 
-        self._memo[partner_id] = total_revenue
-        return total_revenue
+    def _invalidate(self, index: int) -> None:
+        """
+        Drops memoized totals for a partner and all of their ancestors.
+
+        A memoized partner always has memoized descendants, so the walk can stop
+        at the first ancestor that is already missing from the memo.
+        """
+        current = index
+        while current != NO_PARENT and not isnan(self._memo[current]):
+            self._memo[current] = nan
+            current = self._parents[current]
 
-    def calculate_commissions(self) -> Dict[int, float]:
+    def _fill_memo(self) -> None:
         """
-        Calculates the 5% commission for each partner based on the gross profit
-        of all their descendants.
+        Calculates the total revenue from each partner and their downline for
+        every partner missing from the memo.
+
+        Partners missing from the memo are always an upward-closed set (every
+        ancestor of a missing partner is missing too), so a breadth-first walk
+        from the missing roots reaches all of them. Visiting them in reverse
+        walk order handles every child before its parent, without recursion.
+        """
+        memo = self._memo
+        children = self._children
+        revenues = self._revenues
+        names = self._names
+
+        order = array('q', [
+            index for index, parent in enumerate(self._parents)
+            if parent == NO_PARENT and isnan(memo[index]) and names[index] is not None
+        ])
+        # The array grows while it is walked, which makes this a breadth-first walk.
+        for index in order:
+            for child in children[index]:
+                if isnan(memo[child]):
+                    order.append(child)
+
+        for index in reversed(order):
+            # Own revenue plus the memoized totals of all children's downlines
+            total_revenue = revenues[index]
+            for child in children[index]:
+                total_revenue += memo[child]
+            memo[index] = total_revenue
+
+    def calculate_commissions(self) -> Dict[PartnerId, float]:
+        """
+        Calculates each partner's commission on the gross profit of all their
+        descendants, at the flat 5% rate or according to the rank tiers.
+
+        Returns:
+            A mapping of external partner id to commission.
         """
-        commissions: Dict[int, float] = {}
-        
         # First, populate memoization table for all partners
-        for partner_id in self._partners_map:
-            if partner_id not in self._memo:
-                self._calculate_total_downline_revenue(partner_id)
+        self.subtree_totals()
+
+        if self._differential:
+            commissions_by_index = self._calculate_differential_commissions()
+        else:
+            commissions_by_index = self._calculate_rate_commissions()
+
+        # Translate back to external ids only at the output boundary.
+        decode = self._codec.decode
+        return {
+            decode(index): commissions_by_index[index]
+            for index, name in enumerate(self._names)
+            if name is not None
+        }
+
+    def _calculate_rate_commissions(self) -> List[float]:
+        """Calculates commissions by partner index at each partner's own rate."""
+        memo = self._memo
+        commissions = [0.0] * len(self._names)
+        for index, children in enumerate(self._children):
 
-        # Then, calculate commissions
-        for partner_id, partner in self._partners_map.items():
-            
             # Commission is based on the revenue of descendants only.
             descendants_revenue = 0
-            if partner_id in self._adjacency_list:
-                for child_id in self._adjacency_list[partner_id]:
-                    # The memoized value for a child includes the child's own revenue
-                    # plus all of its own descendants.
-                    descendants_revenue += self._memo.get(child_id, 0)
-            
-            daily_gross_profit = descendants_revenue / self._days_in_month
-            commissions[partner_id] = round(daily_gross_profit * COMMISSION_RATE, 2)
-            
+            for child in children:
+                # The memoized value for a child includes the child's own revenue
+                # plus all of its own descendants.
+                descendants_revenue += memo[child]
+
+            rate = self.rate_for_volume(descendants_revenue)
+            commissions[index] = compute_commission(descendants_revenue, self._days_in_month, rate)
+
         return commissions
+
+    def _calculate_differential_commissions(self) -> List[float]:
+        """Calculates commissions by partner index under the differential rule."""
+        _, _, earned = self._differential_pass()
+        return [round(amount / self._days_in_month, 2) for amount in earned]
+
+    def _differential_pass(self) -> Tuple[List[int], array, List[float]]:
+        """
+        Pays out every partner under the differential rule in one bottom-up pass.
+
+        Revenue of a partner is paid first to their parent at the parent's rate,
+        then to each next ancestor with a strictly higher rate, for the rate
+        difference. Rather than walking up from every sale, each partner keeps a
+        bucket per tier of the downline revenue whose highest rate paid so far
+        is that tier's rate; a partner's buckets and earnings follow from their
+        children's buckets alone (see differential_leg), at O(tiers) per child.
+
+        Returns:
+            Each partner's tier index, the flat buckets, and each partner's
+            monthly earnings before dividing by the days in the month.
+        """
+        self._fill_memo()
+        memo = self._memo
+        revenues = self._revenues
+        children = self._children
+        tier_rates = self._tier_rates
+        stride = len(tier_rates)
+        size = len(self._names)
+        tiers = [0] * size
+        buckets = array('d', [0.0]) * (size * stride)
+        earned = [0.0] * size
+
+        order = array('q', [
+            index for index, parent in enumerate(self._parents)
+            if parent == NO_PARENT and self._names[index] is not None
+        ])
+        # The array grows while it is walked, which makes this a breadth-first walk.
+        for index in order:
+            order.extend(children[index])
+
+        for index in reversed(order):
+            descendants_revenue = 0
+            for child in children[index]:
+                descendants_revenue += memo[child]
+            tier = self.tier_for_volume(descendants_revenue)
+
+            node_buckets = [0.0] * stride
+            amount = 0.0
+            for child in children[index]:
+                # A child without a downline has nothing in their buckets.
+                child_buckets = buckets[child * stride:(child + 1) * stride] if children[child] else ()
+                amount += differential_leg(tier, tier_rates, revenues[child], child_buckets, node_buckets)
+            tiers[index] = tier
+            buckets[index * stride:(index + 1) * stride] = array('d', node_buckets)
+            earned[index] = amount
+        return tiers, buckets, earned
+
+def _revenue_array(partners: List[Partner]) -> array:
+    """
+    Packs the partners' monthly revenues into an array('d').
+
+    Raises:
+        ValueError: If a monthly revenue is not a number.
+    """
+    try:
+        return array('d', [p.monthly_revenue for p in partners])
+    except TypeError:
+        for partner in partners:
+            try:
+                array('d', [partner.monthly_revenue])
+            except TypeError:
+                raise ValueError(
+                    f"Error: Partner {partner.id} has a non-numeric monthly revenue {partner.monthly_revenue!r}"
+                )
+        raise
@@ -2,8 +2,22 @@
 Handles loading and validating partner data from a JSON file.
 """
 import json
+import mmap
+from array import array
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import List
+from typing import Dict, List, Tuple
+
+from .id_codec import IdCodec, PartnerId, UNKNOWN_PARENT
+
+# Files smaller than this are parsed in-process; worker start-up would dominate.
+PARALLEL_THRESHOLD_BYTES = 64 * 1024 * 1024
+
+# The gap between two top-level objects: "}", optional whitespace, ",", "{".
+_OBJECT_BOUNDARY = re.compile(rb'}\s*,\s*{')
+_WHITESPACE = b' \t\r\n'
 
 @dataclass(frozen=True, slots=True)
 class Partner:
@@ -11,13 +25,13 @@ class Partner:
     Represents a partner in the MLM network.
 
     Attributes:
-        id: The unique identifier for the partner.
+        id: The unique identifier for the partner, an integer or a string.
         parent_id: The identifier of the parent partner, or None for root partners.
         name: The name of the partner.
         monthly_revenue: The monthly revenue generated by the partner.
     """
-    id: int
-    parent_id: int | None
+    id: PartnerId
+    parent_id: PartnerId | None
     name: str
     monthly_revenue: float
 
@@ -46,16 +60,208 @@ def load_partners(file_path: str) -> List[Partner]:
     if not isinstance(data, list):
         raise ValueError("Error: Input JSON must be a list of partner objects.")
 
-    partners = []
-    for item in data:
-        try:
-            partner = Partner(
-                id=item['id'],
-                parent_id=item['parent_id'],
-                name=item['name'],
-                monthly_revenue=item['monthly_revenue']
-            )
-            partners.append(partner)
-        except (KeyError, TypeError) as e:
-            raise ValueError(f"Invalid data format in partner object: {item}. Missing or invalid key: {e}")
+    return [_partner_from_item(index, item) for index, item in enumerate(data)]
+
+def load_partners_parallel(
+    file_path: str,
+    max_workers: int | None = None,
+    min_parallel_bytes: int = PARALLEL_THRESHOLD_BYTES,
+) -> List[Partner]:
+    """
+    Loads partner data from a large JSON file using several worker processes.
+
+    The file is memory-mapped and split into byte ranges that each start and end
+    on a top-level object boundary. Every worker parses its range into compact
+    columns, and the columns are concatenated in file order. If a split turns out
+    not to be a real boundary (e.g. it fell inside a string), or the JSON is
+    malformed, the file is parsed sequentially instead, so the result and any
+    error are always identical to load_partners.
+
+    Args:
+        file_path: The path to the partners JSON file.
+        max_workers: The number of worker processes. Defaults to the CPU count.
+        min_parallel_bytes: Files smaller than this are loaded with load_partners.
+
+    Returns:
+        A list of Partner objects.
+
+    Raises:
+        FileNotFoundError: If the input file is not found.
+        ValueError: If the JSON is malformed or data is invalid.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    try:
+        file_size = os.path.getsize(file_path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Error: Input file not found at '{file_path}'")
+    if max_workers <= 1 or file_size < min_parallel_bytes:
+        return load_partners(file_path)
+
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        ranges = _split_ranges(mm, max_workers * 4)
+    if ranges is None:
+        return load_partners(file_path)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        chunks = list(executor.map(_parse_range, [file_path] * len(ranges), ranges))
+
+    if any(chunk is None for chunk in chunks):
+        return load_partners(file_path)
+
+    partners: List[Partner] = []
+    for ids, parent_ids, root_positions, names, revenues, error in chunks:
+        if error is not None:
+            # Rebuilding the bad item raises the same error load_partners would.
+            local_index, item = error
+            _partner_from_item(len(partners) + local_index, item)
+        if root_positions:
+            parent_ids = list(parent_ids)
+            for position in root_positions:
+                parent_ids[position] = None
+        partners.extend(map(Partner, ids, parent_ids, names, revenues))
     return partners
+
+def _split_ranges(mm: mmap.mmap, parts: int) -> List[Tuple[int, int]] | None:
+    """
+    Splits the inside of the top-level JSON array into about `parts` byte ranges.
+
+    Returns None if the file is not a single top-level array.
+    """
+    start = 0
+    while start < len(mm) and mm[start] in _WHITESPACE:
+        start += 1
+    end = len(mm)
+    while end > start and mm[end - 1] in _WHITESPACE:
+        end -= 1
+    if end - start < 2 or mm[start] != ord('[') or mm[end - 1] != ord(']'):
+        return None
+    start, end = start + 1, end - 1
+
+    ranges = []
+    target_size = max(1, (end - start) // parts)
+    range_start = start
+    while True:
+        match = _OBJECT_BOUNDARY.search(mm, range_start + target_size, end)
+        if match is None:
+            ranges.append((range_start, end))
+            return ranges
+        ranges.append((range_start, match.start() + 1))
+        range_start = match.end() - 1
+
+def _parse_range(file_path: str, byte_range: Tuple[int, int]) -> tuple | None:
+    """
+    Parses one byte range of objects into columns for the parent process.
+
+    Returns a tuple of (ids, parent ids, root positions, names, revenues,
+    error), or None if the range is not valid JSON. Numeric columns are packed
+    into arrays, which pickle to a fraction of the size of a list of Python
+    numbers; a column falls back to a plain list whenever packing would change a
+    value's type, so the rebuilt Partners equal those from load_partners. Parent
+    ids of root partners are stored as 0 and listed in root positions, which
+    lets the parent column be packed even though roots have no parent. The error
+    holds the (local index, item) of the first invalid object, if any.
+    """
+    start, end = byte_range
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        raw = b"[" + mm[start:end] + b"]"
+    try:
+        items = json.loads(raw)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+
+    ids, parent_ids, root_positions, names, revenues = [], [], [], [], []
+    for index, item in enumerate(items):
+        try:
+            ids.append(item['id'])
+            parent_id = item['parent_id']
+            names.append(item['name'])
+            revenues.append(item['monthly_revenue'])
+        except (KeyError, TypeError):
+            return [], [], [], [], [], (index, item)
+        if parent_id is None:
+            root_positions.append(index)
+            parent_id = 0
+        parent_ids.append(parent_id)
+    return (
+        _pack(ids),
+        _pack(parent_ids),
+        root_positions,
+        names,
+        _pack(revenues),
+        None,
+    )
+
+def _pack(values: list) -> array | list:
+    """
+    Packs a column of ints into an array('q') or a column of floats into an array('d').
+
+    Returns the values unchanged if they are not all exactly of one of those
+    types (e.g. strings, bools, or ints mixed with floats), or if an int does
+    not fit into 64 bits.
+    """
+    if all(value.__class__ is int for value in values):
+        typecode = 'q'
+    elif all(value.__class__ is float for value in values):
+        typecode = 'd'
+    else:
+        return values
+    try:
+        return array(typecode, values)
+    except OverflowError:
+        return values
+
+def _partner_from_item(index: int, item: dict) -> Partner:
+    """
+    Builds a Partner from a decoded JSON object.
+
+    Raises:
+        ValueError: If a key is missing or the item is not an object.
+    """
+    try:
+        return Partner(
+            id=item['id'],
+            parent_id=item['parent_id'],
+            name=item['name'],
+            monthly_revenue=item['monthly_revenue']
+        )
+    except (KeyError, TypeError) as e:
+        raise ValueError(
+            f"Invalid data format in partner object at index {index}: {item}. Missing or invalid key: {e}"
+        )
+
+def index_partners(partners: List[Partner]) -> Tuple[IdCodec, array]:
+    """
+    Assigns each partner a dense index and resolves parents to indices.
+
+    The partner at position i gets index i.
+
+    Args:
+        partners: A list of Partner objects.
+
+    Returns:
+        The IdCodec and an array('q') holding each partner's parent index, or NO_PARENT.
+
+    Raises:
+        ValueError: If an id is duplicated or invalid, or a parent reference is missing.
+    """
+    codec = IdCodec([p.id for p in partners])
+    parents = codec.encode_parents(p.parent_id for p in partners)
+    if UNKNOWN_PARENT in parents:
+        partner = partners[parents.index(UNKNOWN_PARENT)]
+        raise ValueError(f"Error: Partner {partner.id} has a missing parent with id {partner.parent_id}")
+    return codec, parents
+
+def save_commissions(file_path: str, commissions: Dict[PartnerId, float]) -> None:
+    """
+    Writes calculated commissions to a JSON file, creating parent directories as needed.
+
+    Args:
+        file_path: The path to the output commissions JSON file.
+        commissions: A mapping of partner id to commission amount.
+    """
+    output_dir = os.path.dirname(file_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(commissions, f, indent=2)
@@ -0,0 +1,190 @@
+"""
+Applies an append-only NDJSON log of partner events to an in-memory
+commission state, with periodic checkpoints for fast restarts.
+
+Each line of the log is one JSON event:
+
+    {"type": "join", "id": 5, "parent_id": 1, "name": "Partner5", "monthly_revenue": 0}
+    {"type": "revenue", "id": 5, "amount": 120.5}
+    {"type": "sponsor_change", "id": 5, "parent_id": 2}
+    {"type": "termination", "id": 5}
+"""
+import json
+import os
+from typing import Dict
+
+from .data_loader import Partner
+from .commission_engine import CommissionCalculator
+from .id_codec import PartnerId
+
+CHECKPOINT_VERSION = 1
+
+class EventLogIngester:
+    """
+    Keeps a CommissionCalculator in sync with a partner event log.
+
+    The ingester remembers the byte offset of the last applied event. A
+    checkpoint stores that offset together with a compact snapshot of the
+    partners, so recovery only has to replay the events appended since.
+
+    Raises:
+        ValueError: If checkpoint_interval is less than 1.
+    """
+
+    def __init__(
+        self,
+        log_path: str,
+        checkpoint_path: str,
+        days_in_month: int,
+        checkpoint_interval: int = 10000,
+    ):
+        if checkpoint_interval < 1:
+            raise ValueError(
+                f"Error: checkpoint_interval must be at least 1, got {checkpoint_interval}"
+            )
+        self._log_path = log_path
+        self._checkpoint_path = checkpoint_path
+        self._checkpoint_interval = checkpoint_interval
+        self._days_in_month = days_in_month
+        self._calculator = CommissionCalculator([], days_in_month)
+        self._offset = 0
+        self._events_since_checkpoint = 0
+
+    @property
+    def calculator(self) -> CommissionCalculator:
+        """The calculator holding the current partner state."""
+        return self._calculator
+
+    @property
+    def offset(self) -> int:
+        """The byte offset in the log up to which events have been applied."""
+        return self._offset
+
+    def recover(self) -> int:
+        """
+        Restores state from the last checkpoint, then replays the rest of the log.
+
+        Returns:
+            The number of events replayed after the checkpoint.
+
+        Raises:
+            ValueError: If the checkpoint or a replayed event is invalid.
+        """
+        self._calculator = CommissionCalculator([], self._days_in_month)
+        self._offset = 0
+        self._events_since_checkpoint = 0
+
+        if os.path.exists(self._checkpoint_path):
+            self._load_checkpoint()
+
+        return self.ingest()
+
+    def ingest(self) -> int:
+        """
+        Applies all complete events appended to the log since the last call.
+
+        A trailing line without a newline is treated as still being written
+        and is left for the next call.
+
+        Returns:
+            The number of events applied.
+
+        Raises:
+            ValueError: If an event is malformed or cannot be applied.
+        """
+        if not os.path.exists(self._log_path):
+            return 0
+
+        applied = 0
+        with open(self._log_path, 'rb') as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                if line.strip():
+                    self._apply_line(line)
+                    applied += 1
+                    self._events_since_checkpoint += 1
+                self._offset += len(line)
+
+                if self._events_since_checkpoint >= self._checkpoint_interval:
+                    self.checkpoint()
+        return applied
+
+    def checkpoint(self) -> None:
+        """Atomically writes a checkpoint of the current state and log offset."""
+        checkpoint = {
+            "version": CHECKPOINT_VERSION,
+            "log_offset": self._offset,
+            "partners": [
+                [p.id, p.parent_id, p.name, p.monthly_revenue] for p in self._calculator.partners
+            ],
+        }
+
+        checkpoint_dir = os.path.dirname(self._checkpoint_path)
+        if checkpoint_dir:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+
+        tmp_path = f"{self._checkpoint_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._checkpoint_path)
+        self._events_since_checkpoint = 0
+
+    def calculate_commissions(self) -> Dict[PartnerId, float]:
+        """Calculates commissions for the current state."""
+        return self._calculator.calculate_commissions()
+
+    def _load_checkpoint(self) -> None:
+        """Loads partners and the log offset from the checkpoint file."""
+        try:
+            with open(self._checkpoint_path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except json.JSONDecodeError:
+            raise ValueError(f"Error: Malformed checkpoint in '{self._checkpoint_path}'")
+
+        if not isinstance(checkpoint, dict):
+            raise ValueError(f"Error: Malformed checkpoint in '{self._checkpoint_path}': expected an object")
+        if checkpoint.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Error: Unsupported checkpoint version in '{self._checkpoint_path}'")
+
+        try:
+            partners = [Partner(*row) for row in checkpoint["partners"]]
+            offset = checkpoint["log_offset"]
+            if offset.__class__ is not int or offset < 0:
+                raise ValueError(f"invalid log offset {offset!r}")
+        except KeyError as e:
+            raise ValueError(f"Error: Malformed checkpoint in '{self._checkpoint_path}': missing key {e}")
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Error: Malformed checkpoint in '{self._checkpoint_path}': {e}")
+
+        self._calculator = CommissionCalculator(partners, self._days_in_month)
+        self._offset = offset
+
+    def _apply_line(self, line: bytes) -> None:
+        """Parses and applies a single event line."""
+        try:
+            event = json.loads(line)
+            event_type = event['type']
+            partner_id = event['id']
+            if event_type == "join":
+                self._calculator.add_partner(Partner(
+                    id=partner_id,
+                    parent_id=event['parent_id'],
+                    name=event['name'],
+                    monthly_revenue=event['monthly_revenue'],
+                ))
+            elif event_type == "revenue":
+                self._calculator.post_revenue(partner_id, event['amount'])
+            elif event_type == "sponsor_change":
+                self._calculator.change_sponsor(partner_id, event['parent_id'])
+            elif event_type == "termination":
+                self._calculator.remove_partner(partner_id)
+            else:
+                raise ValueError(f"unknown event type '{event_type}'")
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            raise ValueError(
+                f"Error: Invalid event at byte offset {self._offset} in '{self._log_path}': {e}"
+            )
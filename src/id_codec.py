@@ -0,0 +1,93 @@
+"""
+Maps external partner ids to dense indices so hierarchy data can live in flat lists.
+"""
+from array import array
+from typing import Dict, Iterable, List
+
+# External partner ids: CRM integers (possibly sparse 64-bit values) or UUID strings.
+PartnerId = int | str
+
+# Parent index stored for partners without a parent.
+NO_PARENT = -1
+
+# Parent index returned by IdCodec.encode_parents for parent ids that are not known.
+UNKNOWN_PARENT = -2
+
+class IdCodec:
+    """
+    A two-way mapping between external partner ids and dense indices 0..n-1.
+
+    Indices are handed out in the order ids are added, so for a freshly loaded
+    file a partner's index is its position in the file. Discarded ids keep their
+    index reserved; adding the same id again assigns it a new index.
+    """
+
+    def __init__(self, ids: Iterable[PartnerId] = ()):
+        self._ids: List[PartnerId] = list(ids)
+        for partner_id in self._ids:
+            if partner_id.__class__ is not int and partner_id.__class__ is not str:
+                _check_id_type(partner_id)
+        self._indices: Dict[PartnerId, int] = dict(zip(self._ids, range(len(self._ids))))
+        if len(self._indices) != len(self._ids):
+            seen = set()
+            for partner_id in self._ids:
+                if partner_id in seen:
+                    raise ValueError(f"Error: Duplicate partner id {partner_id}")
+                seen.add(partner_id)
+
+    def __len__(self) -> int:
+        """The number of indices handed out, including discarded ones."""
+        return len(self._ids)
+
+    def __contains__(self, partner_id: PartnerId) -> bool:
+        return partner_id in self._indices
+
+    def add(self, partner_id: PartnerId) -> int:
+        """
+        Assigns the next free index to a new id.
+
+        Raises:
+            ValueError: If the id is already known or is not an int or str.
+        """
+        _check_id_type(partner_id)
+        if partner_id in self._indices:
+            raise ValueError(f"Error: Duplicate partner id {partner_id}")
+        index = len(self._ids)
+        self._indices[partner_id] = index
+        self._ids.append(partner_id)
+        return index
+
+    def encode(self, partner_id: PartnerId) -> int:
+        """
+        Returns the index of a known id.
+
+        Raises:
+            ValueError: If the id is unknown.
+        """
+        try:
+            return self._indices[partner_id]
+        except (KeyError, TypeError):
+            raise ValueError(f"Error: Unknown partner with id {partner_id}")
+
+    def encode_parents(self, parent_ids: Iterable[PartnerId | None]) -> array:
+        """
+        Encodes parent ids in bulk into an array('q'): NO_PARENT for None, and
+        UNKNOWN_PARENT for unknown ids.
+        """
+        get = self._indices.get
+        return array('q', [
+            NO_PARENT if parent_id is None else get(parent_id, UNKNOWN_PARENT) for parent_id in parent_ids
+        ])
+
+    def decode(self, index: int) -> PartnerId:
+        """Returns the external id for an index."""
+        return self._ids[index]
+
+    def discard(self, partner_id: PartnerId) -> None:
+        """Forgets an id. Its index is not reused."""
+        del self._indices[partner_id]
+
+def _check_id_type(partner_id: PartnerId) -> None:
+    """Raises ValueError unless the id is an int (but not a bool) or a str."""
+    if isinstance(partner_id, bool) or not isinstance(partner_id, (int, str)):
+        raise ValueError(f"Error: Partner id {partner_id!r} must be an integer or a string")
@@ -0,0 +1,298 @@
+"""
+Evaluates what-if scenarios against a shared baseline hierarchy.
+
+Each scenario is a copy-on-write overlay: it only records the partners it
+changes, and everything else is read from the baseline. Subtree totals are
+recomputed only for partners whose downline actually changed, i.e. the
+ancestor paths of the changed partners. Under differential plans, the
+per-tier buckets of paid-out downline revenue are recomputed on the same paths,
+and reused from the baseline everywhere else.
+"""
+import os
+from bisect import insort
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Sequence, Set
+
+from .commission_engine import CommissionCalculator, COMMISSION_RATE, compute_commission, differential_leg
+from .id_codec import PartnerId, NO_PARENT
+
+@dataclass(frozen=True, slots=True)
+class Scenario:
+    """
+    A set of hypothetical changes to the baseline hierarchy.
+
+    Attributes:
+        name: A label identifying the scenario in results.
+        sponsor_changes: Partner id to new parent id (None makes the partner a root).
+            The partner's whole downline moves with them.
+        revenue_overrides: Partner id to the monthly revenue to use instead of the baseline.
+        commission_rate: The flat commission rate to use, or None for the baseline
+            plan. Only supported when the baseline uses the flat rate.
+    """
+    name: str
+    sponsor_changes: Dict[PartnerId, PartnerId | None] = field(default_factory=dict)
+    revenue_overrides: Dict[PartnerId, float] = field(default_factory=dict)
+    commission_rate: float | None = None
+
+@dataclass(frozen=True, slots=True)
+class ScenarioResult:
+    """
+    The commission outcome of a scenario compared to the baseline.
+
+    Attributes:
+        name: The scenario name.
+        deltas: Partner id to commission change, for partners whose commission changed.
+        total_delta: The change in total commissions paid.
+        error: The error message if the scenario is invalid, otherwise None.
+    """
+    name: str
+    deltas: Dict[PartnerId, float]
+    total_delta: float
+    error: str | None = None
+
+class _Baseline:
+    """
+    The shared, read-only hierarchy, memo and commissions every scenario overlays,
+    all indexed by the calculator's dense partner indices.
+    """
+
+    __slots__ = (
+        "codec", "parents", "revenues", "children", "active", "totals", "commissions", "days_in_month", "plan",
+        "buckets",
+    )
+
+    def __init__(self, calculator: CommissionCalculator):
+        self.codec = calculator.codec
+        self.parents = calculator.parents
+        self.revenues = calculator.revenues
+        self.children = [calculator.children(index) for index in range(len(self.parents))]
+        self.active = calculator.active_indices()
+        self.totals = calculator.subtree_totals()
+        self.commissions = [0.0] * len(self.parents)
+        for partner_id, commission in calculator.calculate_commissions().items():
+            self.commissions[self.codec.encode(partner_id)] = commission
+        self.days_in_month = calculator.days_in_month
+        # An empty calculator carrying just the rate plan.
+        self.plan = CommissionCalculator(
+            [], calculator.days_in_month, calculator.rank_tiers, calculator.differential
+        )
+        # Differential buckets by partner index, flattened (see differential_leg).
+        self.buckets = calculator.differential_state()[1] if calculator.differential else None
+
+def evaluate_scenarios(
+    calculator: CommissionCalculator,
+    scenarios: List[Scenario],
+    max_workers: int | None = None,
+) -> List[ScenarioResult]:
+    """
+    Evaluates scenarios against the calculator's current hierarchy.
+
+    The baseline is built once and shipped to each worker process once, so the
+    per-scenario cost is proportional to the size of its changes rather than
+    to the size of the network.
+
+    Args:
+        calculator: The calculator holding the baseline hierarchy.
+        scenarios: The scenarios to evaluate.
+        max_workers: The number of worker processes. Defaults to the CPU count;
+            1 evaluates everything in the current process.
+
+    Returns:
+        A list of ScenarioResult objects in the same order as the scenarios.
+    """
+    baseline = _Baseline(calculator)
+    max_workers = min(max_workers or os.cpu_count() or 1, len(scenarios))
+    if max_workers <= 1:
+        return [_evaluate(baseline, scenario) for scenario in scenarios]
+
+    chunksize = max(1, len(scenarios) // (max_workers * 4))
+    with ProcessPoolExecutor(
+        max_workers=max_workers, initializer=_init_worker, initargs=(baseline,)
+    ) as executor:
+        return list(executor.map(_evaluate_in_worker, scenarios, chunksize=chunksize))
+
+_worker_baseline: _Baseline | None = None
+
+def _init_worker(baseline: _Baseline) -> None:
+    """Stores the baseline in a worker process for all of its scenarios."""
+    global _worker_baseline
+    _worker_baseline = baseline
+
+def _evaluate_in_worker(scenario: Scenario) -> ScenarioResult:
+    """Evaluates a scenario against the worker's baseline."""
+    return _evaluate(_worker_baseline, scenario)
+
+def _evaluate(baseline: _Baseline, scenario: Scenario) -> ScenarioResult:
+    """Evaluates a single scenario, capturing validation errors in the result."""
+    try:
+        deltas = _compute_deltas(baseline, scenario)
+    except ValueError as e:
+        return ScenarioResult(name=scenario.name, deltas={}, total_delta=0.0, error=str(e))
+    return ScenarioResult(
+        name=scenario.name,
+        deltas=deltas,
+        total_delta=round(sum(deltas.values()), 2),
+    )
+
+def _compute_deltas(baseline: _Baseline, scenario: Scenario) -> Dict[PartnerId, float]:
+    """
+    Recomputes the changed subtree totals and returns per-partner commission deltas.
+
+    Raises:
+        ValueError: If the scenario references unknown partners or creates a cycle.
+    """
+    encode = baseline.codec.encode
+    parent_overlay: Dict[int, int] = {
+        encode(partner_id): NO_PARENT if parent_id is None else encode(parent_id)
+        for partner_id, parent_id in scenario.sponsor_changes.items()
+    }
+    revenue_overrides: Dict[int, float] = {
+        encode(partner_id): revenue for partner_id, revenue in scenario.revenue_overrides.items()
+    }
+
+    if scenario.commission_rate is not None and baseline.plan.rank_tiers is not None:
+        raise ValueError(f"Error: Scenario '{scenario.name}' overrides the rate of a ranked plan")
+
+    # Copy-on-write overlays: only touched parents get their own children list.
+    children_overlay: Dict[int, List[int]] = {}
+    for index, new_parent in parent_overlay.items():
+        old_parent = baseline.parents[index]
+        if old_parent != NO_PARENT:
+            if old_parent not in children_overlay:
+                children_overlay[old_parent] = list(baseline.children[old_parent])
+            children_overlay[old_parent].remove(index)
+        if new_parent != NO_PARENT:
+            if new_parent not in children_overlay:
+                children_overlay[new_parent] = list(baseline.children[new_parent])
+            # In index order, where a freshly built hierarchy would have the partner.
+            insort(children_overlay[new_parent], index)
+
+    def parent_of(index: int) -> int:
+        if index in parent_overlay:
+            return parent_overlay[index]
+        return baseline.parents[index]
+
+    def children_of(index: int) -> List[int]:
+        if index in children_overlay:
+            return children_overlay[index]
+        return baseline.children[index]
+
+    def revenue_of(index: int) -> float:
+        if index in revenue_overrides:
+            return revenue_overrides[index]
+        return baseline.revenues[index]
+
+    # Every partner whose downline changed is an ancestor of a changed partner
+    # or of a moved partner's old or new parent.
+    seeds = [index for index, revenue in revenue_overrides.items() if revenue != baseline.revenues[index]]
+    for index, new_parent in parent_overlay.items():
+        seeds.append(baseline.parents[index])
+        seeds.append(new_parent)
+
+    affected: Set[int] = set()
+    for seed in seeds:
+        path: Set[int] = set()
+        current = seed
+        while current != NO_PARENT and current not in affected:
+            if current in path:
+                raise ValueError(
+                    f"Error: Scenario '{scenario.name}' creates a cycle at partner {baseline.codec.decode(current)}"
+                )
+            path.add(current)
+            current = parent_of(current)
+        affected |= path
+
+    # Iterative post-order over the affected partners only; unaffected
+    # children contribute their baseline totals.
+    totals: Dict[int, float] = {}
+    post_order: List[int] = []
+
+    def total_of(index: int) -> float:
+        if index in affected:
+            return totals[index]
+        return baseline.totals[index]
+
+    for root in affected:
+        if root in totals:
+            continue
+        stack = [(root, False)]
+        while stack:
+            index, children_done = stack.pop()
+            if children_done:
+                # Same order of float additions as the engine's memo, so
+                # unchanged partners get bit-identical totals.
+                total_revenue = revenue_of(index)
+                for child in children_of(index):
+                    total_revenue += total_of(child)
+                totals[index] = total_revenue
+                post_order.append(index)
+                continue
+            stack.append((index, True))
+            for child in children_of(index):
+                if child in affected and child not in totals:
+                    stack.append((child, False))
+
+    if baseline.plan.differential:
+        return _differential_deltas(baseline, post_order, children_of, revenue_of, total_of)
+
+    rate = scenario.commission_rate
+    if rate is None or rate == COMMISSION_RATE:
+        rate = None
+        candidates = affected
+    else:
+        candidates = baseline.active
+
+    deltas: Dict[PartnerId, float] = {}
+    for index in candidates:
+        descendants_revenue = 0
+        for child in children_of(index):
+            descendants_revenue += total_of(child)
+        partner_rate = rate if rate is not None else baseline.plan.rate_for_volume(descendants_revenue)
+        commission = compute_commission(descendants_revenue, baseline.days_in_month, partner_rate)
+        delta = round(commission - baseline.commissions[index], 2)
+        if delta:
+            deltas[baseline.codec.decode(index)] = delta
+    return deltas
+
+def _differential_deltas(
+    baseline: _Baseline,
+    post_order: List[int],
+    children_of: Callable[[int], Sequence[int]],
+    revenue_of: Callable[[int], float],
+    total_of: Callable[[int], float],
+) -> Dict[PartnerId, float]:
+    """
+    Recomputes differential payouts for the affected partners, children first.
+
+    Only the affected partners' tiers, buckets or earnings can change: each one
+    depends on the partner's own downline alone. Unaffected children contribute
+    their baseline buckets, so the cost is O(tiers) per child of an affected partner.
+    """
+    plan = baseline.plan
+    tier_rates = plan.tier_rates
+    stride = len(tier_rates)
+    buckets: Dict[int, List[float]] = {}
+
+    def buckets_of(index: int) -> Sequence[float]:
+        if index in buckets:
+            return buckets[index]
+        return baseline.buckets[index * stride:(index + 1) * stride]
+
+    deltas: Dict[PartnerId, float] = {}
+    for index in post_order:
+        descendants_revenue = 0
+        for child in children_of(index):
+            descendants_revenue += total_of(child)
+        tier = plan.tier_for_volume(descendants_revenue)
+
+        node_buckets = [0.0] * stride
+        amount = 0.0
+        for child in children_of(index):
+            amount += differential_leg(tier, tier_rates, revenue_of(child), buckets_of(child), node_buckets)
+        buckets[index] = node_buckets
+
+        delta = round(round(amount / baseline.days_in_month, 2) - baseline.commissions[index], 2)
+        if delta:
+            deltas[baseline.codec.decode(index)] = delta
+    return deltas
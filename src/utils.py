@@ -1,6 +1,7 @@
 """
 Utility functions for the commission engine.
 """
+import argparse
 import calendar
 from datetime import datetime
 
@@ -26,3 +27,39 @@ def get_current_year_month() -> (int, int):
     """Returns the current year and month."""
     now = datetime.now()
     return now.year, now.month
+
+def parse_month(value: str | None) -> (int, int):
+    """
+    Parses a YYYY-MM month string, falling back to the current month.
+
+    Args:
+        value: The month in YYYY-MM format, or None for the current month.
+
+    Returns:
+        A (year, month) tuple.
+
+    Raises:
+        ValueError: If the value is not in YYYY-MM format.
+    """
+    if not value:
+        return get_current_year_month()
+    try:
+        year, month = map(int, value.split("-"))
+    except ValueError:
+        raise ValueError("Invalid month format. Please use YYYY-MM.")
+    return year, month
+
+def positive_int(value: str) -> int:
+    """
+    Parses a command-line option that must be an integer of at least 1.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not a positive integer.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
@@ -0,0 +1,123 @@
+"""
+Tests for the attribution module.
+"""
+import json
+import random
+import pytest
+from src.data_loader import Partner
+from src.commission_engine import CommissionCalculator, RankTier
+from src.attribution import CommissionAttributor
+
+DAYS_IN_MONTH = 30
+RANK_TIERS = [RankTier(0, 0.03), RankTier(10000, 0.05), RankTier(100000, 0.07)]
+
+def random_partners(count, seed=3):
+    """Builds a random hierarchy of the given size."""
+    rng = random.Random(seed)
+    partners = [Partner(id=1, parent_id=None, name="P1", monthly_revenue=1000)]
+    for i in range(2, count + 1):
+        partners.append(Partner(id=i, parent_id=rng.randint(max(1, i - 15), i - 1), name=f"P{i}",
+                                monthly_revenue=rng.choice([0, 500, 5000, 40000])))
+    return partners
+
+def naive_level_revenues(partners, partner_id):
+    """Sums downline revenue per level by expanding the subtree."""
+    children = {p.id: [] for p in partners}
+    revenue = {p.id: p.monthly_revenue for p in partners}
+    for p in partners:
+        if p.parent_id is not None:
+            children[p.parent_id].append(p.id)
+    levels = []
+    frontier = children[partner_id]
+    while frontier:
+        levels.append(sum(revenue[pid] for pid in frontier))
+        frontier = [child_id for pid in frontier for child_id in children[pid]]
+    return levels
+
+def test_explain_happy_path(happy_path_partners):
+    """
+    Tests the leg and level breakdown for the sample hierarchy.
+    """
+    attributor = CommissionAttributor(CommissionCalculator(happy_path_partners, DAYS_IN_MONTH))
+
+    attribution = attributor.explain(1)
+
+    assert attribution.commission == 20.0
+    assert attribution.legs == {2: round(7000 / 30 * 0.05, 2), 3: round(5000 / 30 * 0.05, 2)}
+    assert attribution.levels == [round(10000 / 30 * 0.05, 2), round(2000 / 30 * 0.05, 2)]
+    assert attributor.explain(4).legs == {}
+    assert attributor.explain(4).levels == []
+
+def test_levels_match_subtree_expansion():
+    """
+    Tests the indexed per-level breakdown against expanding each subtree.
+    """
+    partners = random_partners(300)
+    calculator = CommissionCalculator(partners, DAYS_IN_MONTH)
+    attributor = CommissionAttributor(calculator)
+    commissions = calculator.calculate_commissions()
+
+    for partner in partners:
+        attribution = attributor.explain(partner.id)
+        expected = [round(r / DAYS_IN_MONTH * 0.05, 2) for r in naive_level_revenues(partners, partner.id)]
+        assert attribution.levels == pytest.approx(expected, abs=1e-2)
+        assert attribution.commission == commissions[partner.id]
+
+@pytest.mark.parametrize("differential", [False, True])
+def test_ranked_plan_breakdown_adds_up(differential):
+    """
+    Tests that legs and levels add up to the commission under ranked plans.
+    """
+    partners = random_partners(300)
+    calculator = CommissionCalculator(partners, DAYS_IN_MONTH, RANK_TIERS, differential)
+    attributor = CommissionAttributor(calculator)
+    commissions = calculator.calculate_commissions()
+
+    for partner in partners:
+        attribution = attributor.explain(partner.id)
+        tolerance = 0.01 * (len(attribution.legs) + 1)
+        assert attribution.commission == commissions[partner.id]
+        assert sum(attribution.legs.values()) == pytest.approx(attribution.commission, abs=tolerance)
+        assert sum(attribution.levels) == pytest.approx(attribution.commission, abs=0.01 * (len(attribution.levels) + 1))
+
+def test_explain_unknown_partner(happy_path_partners):
+    """
+    Tests that explaining an unknown partner raises ValueError.
+    """
+    attributor = CommissionAttributor(CommissionCalculator(happy_path_partners, DAYS_IN_MONTH))
+    with pytest.raises(ValueError, match="Unknown partner"):
+        attributor.explain(99)
+
+def test_stream_writes_one_line_per_partner(happy_path_partners, tmp_path):
+    """
+    Tests that the bulk breakdown is streamed as NDJSON.
+    """
+    attributor = CommissionAttributor(CommissionCalculator(happy_path_partners, DAYS_IN_MONTH))
+    output_file = tmp_path / "out" / "attribution.ndjson"
+
+    assert attributor.stream(str(output_file)) == 4
+
+    with open(output_file) as f:
+        records = {record["partner_id"]: record for record in map(json.loads, f)}
+    assert records.keys() == {1, 2, 3, 4}
+    assert records[2] == {"partner_id": 2, "commission": 3.33, "legs": {"4": 3.33}, "levels": [3.33]}
+
+@pytest.mark.parametrize("differential", [False, True])
+def test_tier_boundary_matches_payout(differential):
+    """
+    Tests that a downline volume exactly on a tier boundary gets the engine's tier.
+    """
+    # 0.82 + 31.98 - 0.82 is just below 31.98, so subtracting own revenue picks the lower tier.
+    partners = [
+        Partner(id=1, parent_id=None, name="P1", monthly_revenue=0),
+        Partner(id=2, parent_id=1, name="P2", monthly_revenue=0.82),
+        Partner(id=3, parent_id=2, name="P3", monthly_revenue=31.98),
+    ]
+    tiers = [RankTier(0, 0.03), RankTier(31.98, 0.05)]
+    calculator = CommissionCalculator(partners, 1, tiers, differential)
+    attributor = CommissionAttributor(calculator)
+
+    commissions = calculator.calculate_commissions()
+
+    assert commissions[2] == 1.6
+    assert {p.id: attributor.explain(p.id).commission for p in partners} == commissions
@@ -0,0 +1,122 @@
+"""
+Tests for the batch_runner module.
+"""
+import json
+import multiprocessing
+import os
+import pytest
+from src import batch_runner
+from src.batch_runner import BatchJob, load_manifest, run_batch, run_job, save_summary
+
+def test_run_job_happy_path(partners_file, tmp_path):
+    """
+    Tests that a single job writes the expected commissions.
+    """
+    output_file = tmp_path / "out" / "commissions.json"
+    result = run_job(BatchJob(str(partners_file), str(output_file), "2023-04"))
+
+    assert result.ok
+    assert result.error is None
+    assert result.num_partners == 4
+    with open(output_file) as f:
+        commissions = json.load(f)
+    assert commissions["1"] == pytest.approx(20.0, abs=1e-2)
+
+def test_run_job_captures_errors(tmp_path):
+    """
+    Tests that a failing job reports its error instead of raising.
+    """
+    result = run_job(BatchJob(str(tmp_path / "missing.json"), str(tmp_path / "out.json"), "2023-04"))
+
+    assert not result.ok
+    assert "not found" in result.error
+
+def test_run_batch_isolates_failures(partners_file, tmp_path):
+    """
+    Tests that one failing job does not affect the others and results keep manifest order.
+    """
+    jobs = [
+        BatchJob(str(tmp_path / "missing.json"), str(tmp_path / "a.json"), "2023-04"),
+        BatchJob(str(partners_file), str(tmp_path / "b.json"), "2023-04"),
+        BatchJob(str(partners_file), str(tmp_path / "c.json"), "bad-month"),
+    ]
+    results = run_batch(jobs, max_workers=2)
+
+    assert [r.output for r in results] == [j.output for j in jobs]
+    assert [r.ok for r in results] == [False, True, False]
+    assert (tmp_path / "b.json").exists()
+    assert "Invalid month format" in results[2].error
+
+def test_load_manifest_resolves_relative_paths(tmp_path):
+    """
+    Tests that manifest paths are resolved relative to the manifest file.
+    """
+    manifest_file = tmp_path / "manifest.json"
+    with open(manifest_file, 'w') as f:
+        json.dump([{"input": "in.json", "output": "out/out.json", "month": "2024-02"}], f)
+
+    jobs = load_manifest(str(manifest_file))
+
+    assert jobs == [BatchJob(str(tmp_path / "in.json"), str(tmp_path / "out" / "out.json"), "2024-02")]
+
+def test_load_manifest_invalid_entry(tmp_path):
+    """
+    Tests that ValueError is raised for a manifest entry without an input.
+    """
+    manifest_file = tmp_path / "manifest.json"
+    with open(manifest_file, 'w') as f:
+        json.dump([{"output": "out.json"}], f)
+
+    with pytest.raises(ValueError, match="Invalid job entry"):
+        load_manifest(str(manifest_file))
+
+def test_save_summary(partners_file, tmp_path):
+    """
+    Tests that the summary reports per-job timings and errors.
+    """
+    results = [
+        run_job(BatchJob(str(partners_file), str(tmp_path / "ok.json"), "2023-04")),
+        run_job(BatchJob(str(tmp_path / "missing.json"), str(tmp_path / "fail.json"), "2023-04")),
+    ]
+    summary_file = tmp_path / "summary.json"
+    save_summary(str(summary_file), results, 1.5)
+
+    with open(summary_file) as f:
+        summary = json.load(f)
+    assert summary["succeeded"] == 1
+    assert summary["failed"] == 1
+    assert summary["jobs"][0]["elapsed_seconds"] >= 0
+    assert summary["jobs"][1]["error"]
+
+def crashing_run_job(job):
+    """Kills the worker process for inputs named crash.json, like an OOM kill would."""
+    if job.input.endswith("crash.json"):
+        os._exit(1)
+    return run_job(job)
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="needs forked workers")
+def test_run_batch_isolates_crashing_worker(partners_file, tmp_path, monkeypatch):
+    """
+    Tests that a job killing its worker fails alone and the other jobs still run.
+    """
+    monkeypatch.setattr(batch_runner, "run_job", crashing_run_job)
+    crash_file = tmp_path / "crash.json"
+    # Make the crashing input the largest so it is scheduled first.
+    crash_file.write_text(" " * 10_000)
+    jobs = [BatchJob(str(crash_file), str(tmp_path / "crash_out.json"), "2023-04")] + [
+        BatchJob(str(partners_file), str(tmp_path / f"out{i}.json"), "2023-04") for i in range(6)
+    ]
+
+    results = run_batch(jobs, max_workers=2)
+
+    assert [r.ok for r in results] == [False] + [True] * 6
+    assert "BrokenProcessPool" in results[0].error
+    assert results[0].elapsed_seconds > 0
+    assert all((tmp_path / f"out{i}.json").exists() for i in range(6))
+
+def test_run_batch_rejects_non_positive_workers(partners_file, tmp_path):
+    """
+    Tests that fewer than one worker is rejected.
+    """
+    with pytest.raises(ValueError, match="at least 1"):
+        run_batch([BatchJob(str(partners_file), str(tmp_path / "out.json"))], max_workers=0)
@@ -1,9 +1,11 @@
 """
 Tests for the commission_engine module.
 """
+import math
 import pytest
+from dataclasses import replace
 from src.data_loader import Partner
-from src.commission_engine import CommissionCalculator
+from src.commission_engine import CommissionCalculator, RankTier
 
 DAYS_IN_MONTH = 30 # For simplicity in tests
 
@@ -90,3 +92,167 @@ def test_deep_hierarchy_commission():
     assert commissions.keys() == expected.keys()
     for pid, expected_val in expected.items():
         assert commissions[pid] == pytest.approx(expected_val, abs=1e-2)
+
+def test_incremental_updates_match_full_recalculation(commission_calculator):
+    """
+    Tests that mutating the calculator invalidates memoized totals correctly.
+    """
+    commission_calculator.calculate_commissions()
+
+    commission_calculator.add_partner(Partner(id=5, parent_id=3, name="Partner5", monthly_revenue=3000))
+    commission_calculator.post_revenue(4, 1000)
+    commission_calculator.change_sponsor(2, 3)
+    commission_calculator.remove_partner(3)
+
+    expected = CommissionCalculator(commission_calculator.partners, DAYS_IN_MONTH).calculate_commissions()
+    assert commission_calculator.calculate_commissions() == expected
+    # Partner 1 now has 2 (5000), 4 (3000) and 5 (3000) below them.
+    assert commission_calculator.calculate_commissions()[1] == pytest.approx((11000 / DAYS_IN_MONTH) * 0.05, abs=1e-2)
+
+def test_change_sponsor_rejects_cycles(commission_calculator):
+    """
+    Tests that a partner cannot be moved under their own downline.
+    """
+    with pytest.raises(ValueError, match="would create a cycle"):
+        commission_calculator.change_sponsor(1, 4)
+
+RANK_TIERS = [RankTier(0, 0.03), RankTier(10000, 0.05), RankTier(100000, 0.07)]
+
+def naive_differential_commissions(partners, rank_tiers, days_in_month):
+    """Pays each sale up the line by walking every ancestor of every partner."""
+    by_id = {p.id: p for p in partners}
+    calculator = CommissionCalculator(partners, days_in_month, rank_tiers)
+    totals = calculator.subtree_totals()
+    # Downline volume summed over the children's totals, as the engine does.
+    volume = {p.id: 0 for p in partners}
+    for p in partners:
+        if p.parent_id is not None:
+            volume[p.parent_id] += totals[calculator.codec.encode(p.id)]
+    rate = {p.id: calculator.rate_for_volume(volume[p.id]) for p in partners}
+    earned = {p.id: 0.0 for p in partners}
+    for p in partners:
+        paid_rate = 0.0
+        ancestor_id = p.parent_id
+        while ancestor_id is not None:
+            if rate[ancestor_id] > paid_rate:
+                earned[ancestor_id] += (rate[ancestor_id] - paid_rate) * p.monthly_revenue
+                paid_rate = rate[ancestor_id]
+            ancestor_id = by_id[ancestor_id].parent_id
+    return {pid: round(amount / days_in_month, 2) for pid, amount in earned.items()}
+
+def test_rank_tiers_set_rate_by_downline_volume():
+    """
+    Tests that each partner earns the rate of the tier their downline volume reaches.
+    """
+    partners = [
+        Partner(id=1, parent_id=None, name="Leader", monthly_revenue=0),
+        Partner(id=2, parent_id=1, name="Mid", monthly_revenue=50000),
+        Partner(id=3, parent_id=2, name="Seller", monthly_revenue=60000),
+    ]
+    calculator = CommissionCalculator(partners, DAYS_IN_MONTH, RANK_TIERS)
+    commissions = calculator.calculate_commissions()
+
+    assert commissions[1] == pytest.approx(110000 / DAYS_IN_MONTH * 0.07, abs=1e-2)
+    assert commissions[2] == pytest.approx(60000 / DAYS_IN_MONTH * 0.05, abs=1e-2)
+    assert commissions[3] == 0.0
+
+def test_differential_pays_only_rate_difference():
+    """
+    Tests that an upline earns only the difference over a lower-ranked downline leader.
+    """
+    partners = [
+        Partner(id=1, parent_id=None, name="Leader", monthly_revenue=0),
+        Partner(id=2, parent_id=1, name="Mid", monthly_revenue=50000),
+        Partner(id=3, parent_id=2, name="Seller", monthly_revenue=60000),
+    ]
+    calculator = CommissionCalculator(partners, DAYS_IN_MONTH, RANK_TIERS, differential=True)
+    commissions = calculator.calculate_commissions()
+
+    # Leader (7%) earns 7% on Mid's sales and 7% - 5% on Seller's sales.
+    assert commissions[1] == pytest.approx((50000 * 0.07 + 60000 * 0.02) / DAYS_IN_MONTH, abs=1e-2)
+    assert commissions[2] == pytest.approx(60000 * 0.05 / DAYS_IN_MONTH, abs=1e-2)
+    assert commissions[3] == 0.0
+
+def test_differential_matches_naive_ancestor_walk():
+    """
+    Tests the bucket-based differential calculation against a naive ancestor walk.
+    """
+    import random
+    rng = random.Random(7)
+    partners = [Partner(id=1, parent_id=None, name="P1", monthly_revenue=1000)]
+    for i in range(2, 400):
+        partners.append(Partner(id=i, parent_id=rng.randint(max(1, i - 20), i - 1), name=f"P{i}",
+                                monthly_revenue=rng.choice([0, 500, 5000, 40000])))
+
+    calculator = CommissionCalculator(partners, DAYS_IN_MONTH, RANK_TIERS, differential=True)
+
+    assert calculator.calculate_commissions() == naive_differential_commissions(partners, RANK_TIERS, DAYS_IN_MONTH)
+
+def test_invalid_rank_configuration():
+    """
+    Tests that unsorted tiers and differential without tiers are rejected.
+    """
+    with pytest.raises(ValueError, match="strictly increasing"):
+        CommissionCalculator([], DAYS_IN_MONTH, [RankTier(100, 0.05), RankTier(0, 0.03)])
+    with pytest.raises(ValueError, match="require rank tiers"):
+        CommissionCalculator([], DAYS_IN_MONTH, differential=True)
+
+def test_very_deep_hierarchy_does_not_recurse():
+    """
+    Tests that a chain deeper than the recursion limit is handled.
+    """
+    depth = 5000
+    partners = [Partner(id=1, parent_id=None, name="P1", monthly_revenue=1)] + [
+        Partner(id=i, parent_id=i - 1, name=f"P{i}", monthly_revenue=1) for i in range(2, depth + 1)
+    ]
+    commissions = CommissionCalculator(partners, DAYS_IN_MONTH).calculate_commissions()
+    assert commissions[1] == pytest.approx((depth - 1) / DAYS_IN_MONTH * 0.05, abs=1e-2)
+
+def test_sparse_and_string_ids():
+    """
+    Tests that sparse 64-bit and UUID string ids give the same results as small ints.
+    """
+    root, child = 2**63 - 1, "7d0c3a52-2c57-4f8e-b5a4-3f1f0b6a9c10"
+    partners = [
+        Partner(id=root, parent_id=None, name="Root", monthly_revenue=10000),
+        Partner(id=child, parent_id=root, name="Child", monthly_revenue=6000),
+        Partner(id=17, parent_id=child, name="Grandchild", monthly_revenue=3000),
+    ]
+    calculator = CommissionCalculator(partners, DAYS_IN_MONTH)
+    commissions = calculator.calculate_commissions()
+
+    assert list(commissions) == [root, child, 17]
+    assert commissions[root] == pytest.approx((9000 / DAYS_IN_MONTH) * 0.05, abs=1e-2)
+    assert commissions[child] == pytest.approx((3000 / DAYS_IN_MONTH) * 0.05, abs=1e-2)
+
+    calculator.remove_partner(child)
+    calculator.add_partner(Partner(id=child, parent_id=17, name="Child", monthly_revenue=6000))
+    assert list(calculator.calculate_commissions()) == [root, 17, child]
+    assert calculator.calculate_commissions()[17] == pytest.approx((6000 / DAYS_IN_MONTH) * 0.05, abs=1e-2)
+
+def test_removed_partner_has_nan_total_and_no_partner_object():
+    """
+    Tests that removed partners leave a NaN memo entry and drop out of the rebuilt partners.
+    """
+    partners = [
+        Partner(id=1, parent_id=None, name="Root", monthly_revenue=1000),
+        Partner(id=2, parent_id=1, name="Child", monthly_revenue=500),
+        Partner(id=3, parent_id=2, name="Grandchild", monthly_revenue=250),
+    ]
+    calculator = CommissionCalculator(partners, DAYS_IN_MONTH)
+    calculator.remove_partner(2)
+
+    totals = calculator.subtree_totals()
+
+    assert math.isnan(totals[1])
+    assert list(totals[::2]) == [1250, 250]
+    assert calculator.partners == [partners[0], replace(partners[2], parent_id=1)]
+
+def test_non_numeric_revenue_is_rejected():
+    """
+    Tests that a monthly revenue that is not a number raises ValueError naming the partner.
+    """
+    partners = [Partner(id=1, parent_id=None, name="Root", monthly_revenue="1000")]
+
+    with pytest.raises(ValueError, match="Partner 1 has a non-numeric monthly revenue"):
+        CommissionCalculator(partners, DAYS_IN_MONTH)
@@ -3,7 +3,8 @@ Tests for the data_loader module.
 """
 import json
 import pytest
-from src.data_loader import load_partners, Partner
+from src import data_loader
+from src.data_loader import load_partners, load_partners_parallel, Partner
 
 def test_load_partners_happy_path(partners_file):
     """
@@ -60,3 +61,85 @@ def test_load_partners_not_a_list(tmp_path):
 
     with pytest.raises(ValueError, match="Input JSON must be a list"):
         load_partners(not_a_list_file)
+
+def write_partners(path, data, indent=None):
+    """Writes partner data to a JSON file."""
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=indent)
+    return path
+
+@pytest.fixture
+def many_partners_data():
+    """Fixture for a few hundred partners whose names contain no JSON punctuation."""
+    data = [{"id": 1, "parent_id": None, "name": "Partner1", "monthly_revenue": 1000}]
+    for i in range(2, 300):
+        data.append({"id": i, "parent_id": i // 2, "name": f"Partner{i}", "monthly_revenue": i * 1.5})
+    return data
+
+@pytest.fixture
+def sequential_fallbacks(monkeypatch):
+    """Fixture that records every time load_partners_parallel falls back to load_partners."""
+    calls = []
+
+    def counting_load_partners(file_path):
+        calls.append(file_path)
+        return load_partners(file_path)
+
+    monkeypatch.setattr(data_loader, "load_partners", counting_load_partners)
+    return calls
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_load_partners_parallel_matches_sequential(tmp_path, many_partners_data, sequential_fallbacks, indent):
+    """
+    Tests that the parallel path itself returns exactly what load_partners returns.
+    """
+    file_path = write_partners(tmp_path / "partners.json", many_partners_data, indent)
+
+    partners = load_partners_parallel(str(file_path), max_workers=2, min_parallel_bytes=0)
+
+    assert sequential_fallbacks == []
+    expected = load_partners(str(file_path))
+    assert partners == expected
+    assert [type(p.monthly_revenue) for p in partners] == [type(p.monthly_revenue) for p in expected]
+    assert partners[0].parent_id is None
+
+def test_load_partners_parallel_falls_back_on_split_inside_string(tmp_path, many_partners_data, sequential_fallbacks):
+    """
+    Tests that names containing object boundaries make the loader fall back to load_partners.
+    """
+    for item in many_partners_data:
+        item["name"] = 'Tricky' + ' }, {"id": 0}' * 20
+    file_path = write_partners(tmp_path / "partners.json", many_partners_data)
+
+    partners = load_partners_parallel(str(file_path), max_workers=2, min_parallel_bytes=0)
+
+    assert sequential_fallbacks == [str(file_path)]
+    assert partners == load_partners(str(file_path))
+
+def test_load_partners_parallel_reports_record_index(tmp_path, many_partners_data):
+    """
+    Tests that an invalid record deep in the file is reported at its global index.
+    """
+    del many_partners_data[250]['name']
+    file_path = write_partners(tmp_path / "partners.json", many_partners_data)
+
+    with pytest.raises(ValueError, match="at index 250:"):
+        load_partners_parallel(str(file_path), max_workers=2, min_parallel_bytes=0)
+
+def test_load_partners_parallel_malformed_json(tmp_path, many_partners_data):
+    """
+    Tests that malformed JSON raises the same error as load_partners.
+    """
+    file_path = tmp_path / "malformed.json"
+    with open(file_path, 'w') as f:
+        f.write(json.dumps(many_partners_data)[:-1])
+
+    with pytest.raises(ValueError, match="Malformed JSON"):
+        load_partners_parallel(str(file_path), max_workers=2, min_parallel_bytes=0)
+
+def test_load_partners_parallel_file_not_found():
+    """
+    Tests that FileNotFoundError is raised for a non-existent file.
+    """
+    with pytest.raises(FileNotFoundError):
+        load_partners_parallel("non_existent_file.json", max_workers=2)
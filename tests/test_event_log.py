@@ -0,0 +1,153 @@
+"""
+Tests for the event_log module.
+"""
+import json
+import pytest
+from src.data_loader import Partner
+from src.commission_engine import CommissionCalculator
+from src.event_log import EventLogIngester
+
+DAYS_IN_MONTH = 30
+
+def write_events(path, events, mode='a'):
+    """Appends events to an NDJSON log file."""
+    with open(path, mode) as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+
+@pytest.fixture
+def join_events(sample_partners_data):
+    """Fixture for join events that build the sample hierarchy."""
+    return [{"type": "join", **p} for p in sample_partners_data]
+
+def test_ingest_matches_full_calculation(tmp_path, join_events, happy_path_partners):
+    """
+    Tests that replaying join events gives the same commissions as a full calculation.
+    """
+    log_file = tmp_path / "events.ndjson"
+    write_events(log_file, join_events)
+
+    ingester = EventLogIngester(str(log_file), str(tmp_path / "checkpoint.json"), DAYS_IN_MONTH)
+    assert ingester.ingest() == 4
+
+    expected = CommissionCalculator(happy_path_partners, DAYS_IN_MONTH).calculate_commissions()
+    assert ingester.calculate_commissions() == expected
+
+def test_ingest_applies_all_event_types(tmp_path, join_events):
+    """
+    Tests revenue, sponsor change and termination events.
+    """
+    log_file = tmp_path / "events.ndjson"
+    write_events(log_file, join_events)
+    ingester = EventLogIngester(str(log_file), str(tmp_path / "checkpoint.json"), DAYS_IN_MONTH)
+    ingester.ingest()
+    ingester.calculate_commissions()
+
+    write_events(log_file, [
+        {"type": "revenue", "id": 4, "amount": 1000},
+        {"type": "sponsor_change", "id": 4, "parent_id": 3},
+        {"type": "termination", "id": 3},
+    ])
+    assert ingester.ingest() == 3
+
+    # Partner 4 (3000) rolls up to partner 1 after partner 3 is terminated.
+    expected = CommissionCalculator([
+        Partner(1, None, "Partner1", 10000),
+        Partner(2, 1, "Partner2", 5000),
+        Partner(4, 1, "Partner4", 3000),
+    ], DAYS_IN_MONTH).calculate_commissions()
+    assert ingester.calculate_commissions() == expected
+
+def test_ingest_skips_incomplete_trailing_line(tmp_path, join_events):
+    """
+    Tests that a partially written last line is left for the next ingest.
+    """
+    log_file = tmp_path / "events.ndjson"
+    write_events(log_file, join_events[:1])
+    with open(log_file, 'a') as f:
+        f.write('{"type": "join", "id": 2, "parent_id"')
+
+    ingester = EventLogIngester(str(log_file), str(tmp_path / "checkpoint.json"), DAYS_IN_MONTH)
+    assert ingester.ingest() == 1
+
+    with open(log_file, 'a') as f:
+        f.write(': 1, "name": "Partner2", "monthly_revenue": 5000}\n')
+    assert ingester.ingest() == 1
+    assert len(ingester.calculator.partners) == 2
+
+def test_recover_replays_only_the_tail(tmp_path, join_events):
+    """
+    Tests that recovery restores the checkpoint and replays events written after it.
+    """
+    log_file = tmp_path / "events.ndjson"
+    checkpoint_file = tmp_path / "checkpoint.json"
+    write_events(log_file, join_events)
+
+    ingester = EventLogIngester(str(log_file), str(checkpoint_file), DAYS_IN_MONTH)
+    ingester.ingest()
+    ingester.checkpoint()
+    write_events(log_file, [{"type": "sponsor_change", "id": 2, "parent_id": 3}])
+    ingester.ingest()
+
+    restarted = EventLogIngester(str(log_file), str(checkpoint_file), DAYS_IN_MONTH)
+    assert restarted.recover() == 1
+    assert restarted.offset == ingester.offset
+    assert restarted.calculate_commissions() == ingester.calculate_commissions()
+
+def test_automatic_checkpoint_interval(tmp_path, join_events):
+    """
+    Tests that a checkpoint is written after every checkpoint_interval events.
+    """
+    log_file = tmp_path / "events.ndjson"
+    checkpoint_file = tmp_path / "checkpoint.json"
+    write_events(log_file, join_events)
+
+    ingester = EventLogIngester(str(log_file), str(checkpoint_file), DAYS_IN_MONTH, checkpoint_interval=3)
+    ingester.ingest()
+
+    with open(checkpoint_file) as f:
+        checkpoint = json.load(f)
+    assert len(checkpoint["partners"]) == 3
+
+def test_invalid_event_reports_offset(tmp_path, join_events):
+    """
+    Tests that an invalid event raises ValueError with its byte offset.
+    """
+    log_file = tmp_path / "events.ndjson"
+    write_events(log_file, join_events)
+    write_events(log_file, [{"type": "sponsor_change", "id": 1, "parent_id": 4}])
+
+    ingester = EventLogIngester(str(log_file), str(tmp_path / "checkpoint.json"), DAYS_IN_MONTH)
+    with pytest.raises(ValueError, match="Invalid event at byte offset .*cycle"):
+        ingester.ingest()
+
+@pytest.mark.parametrize("interval", [0, -1])
+def test_rejects_non_positive_checkpoint_interval(tmp_path, interval):
+    """
+    Tests that a checkpoint_interval below 1 is rejected up front.
+    """
+    with pytest.raises(ValueError, match="checkpoint_interval must be at least 1"):
+        EventLogIngester(
+            str(tmp_path / "events.ndjson"), str(tmp_path / "checkpoint.json"), DAYS_IN_MONTH,
+            checkpoint_interval=interval,
+        )
+
+@pytest.mark.parametrize("checkpoint", [
+    [[1, None, "a"]],
+    {"version": 1, "log_offset": 0},
+    {"version": 1, "partners": []},
+    {"version": 1, "log_offset": 0, "partners": [[1, None, "a"]]},
+    {"version": 1, "log_offset": 0, "partners": [7]},
+    {"version": 1, "log_offset": -5, "partners": []},
+])
+def test_recover_rejects_malformed_checkpoint(tmp_path, checkpoint):
+    """
+    Tests that a checkpoint which is valid JSON but has the wrong shape raises ValueError.
+    """
+    checkpoint_file = tmp_path / "checkpoint.json"
+    with open(checkpoint_file, 'w') as f:
+        json.dump(checkpoint, f)
+
+    ingester = EventLogIngester(str(tmp_path / "events.ndjson"), str(checkpoint_file), DAYS_IN_MONTH)
+    with pytest.raises(ValueError, match="Malformed checkpoint"):
+        ingester.recover()
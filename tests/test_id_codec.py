@@ -0,0 +1,49 @@
+"""
+Tests for the id_codec module.
+"""
+import pytest
+from src.id_codec import IdCodec, NO_PARENT, UNKNOWN_PARENT
+
+def test_codec_assigns_dense_indices_in_order():
+    """
+    Tests that sparse and string ids map to 0..n-1 and back.
+    """
+    ids = [2**62 + 7, "3f2b6c1e-1d4a-4c55-9a51-0b6f1c2d9e11", 5]
+    codec = IdCodec(ids)
+
+    assert len(codec) == 3
+    assert [codec.encode(pid) for pid in ids] == [0, 1, 2]
+    assert [codec.decode(index) for index in range(3)] == ids
+
+def test_codec_rejects_duplicate_and_invalid_ids():
+    """
+    Tests that duplicate and non int/str ids raise ValueError.
+    """
+    codec = IdCodec([1])
+    with pytest.raises(ValueError, match="Duplicate partner id"):
+        codec.add(1)
+    with pytest.raises(ValueError, match="must be an integer or a string"):
+        codec.add(1.5)
+    with pytest.raises(ValueError, match="must be an integer or a string"):
+        codec.add(True)
+
+def test_codec_discard_keeps_index_reserved():
+    """
+    Tests that a discarded id gets a new index when added again.
+    """
+    codec = IdCodec(["a", "b"])
+    codec.discard("a")
+
+    assert "a" not in codec
+    with pytest.raises(ValueError, match="Unknown partner"):
+        codec.encode("a")
+    assert codec.add("a") == 2
+    assert codec.decode(0) == "a"
+
+def test_codec_encode_parents_marks_roots_and_unknown_ids():
+    """
+    Tests that bulk parent encoding uses NO_PARENT for roots and UNKNOWN_PARENT for unknown ids.
+    """
+    codec = IdCodec([10, "a"])
+
+    assert list(codec.encode_parents([None, 10, "a", 99])) == [NO_PARENT, 0, 1, UNKNOWN_PARENT]
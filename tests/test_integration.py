@@ -74,3 +74,129 @@ def test_cli_cycle_error(tmp_path):
     assert result.returncode == 1
     assert "Cycle detected" in result.stderr
     assert not output_file.exists()
+
+def test_batch_cli_end_to_end(partners_file, tmp_path):
+    """
+    Tests the batch CLI workflow from manifest to per-job outputs and summary.
+    """
+    manifest_file = tmp_path / "manifest.json"
+    with open(manifest_file, 'w') as f:
+        json.dump([
+            {"input": str(partners_file), "output": "out/april.json", "month": "2023-04"},
+            {"input": "missing.json", "output": "out/missing.json", "month": "2023-04"},
+        ], f)
+    summary_file = tmp_path / "summary.json"
+
+    command = [
+        sys.executable,
+        "batch.py",
+        "--manifest",
+        str(manifest_file),
+        "--summary",
+        str(summary_file),
+    ]
+
+    result = subprocess.run(command, capture_output=True, text=True, check=False)
+
+    assert result.returncode == 1
+    assert "not found" in result.stderr
+    assert (tmp_path / "out" / "april.json").exists()
+
+    with open(summary_file, 'r') as f:
+        summary = json.load(f)
+    assert summary["succeeded"] == 1
+    assert summary["failed"] == 1
+
+def test_cli_attribution_output(partners_file, tmp_path):
+    """
+    Tests that the CLI writes the per-partner attribution breakdown when requested.
+    """
+    attribution_file = tmp_path / "attribution.ndjson"
+    command = [
+        sys.executable,
+        "main.py",
+        "--input",
+        str(partners_file),
+        "--output",
+        str(tmp_path / "commissions.json"),
+        "--month",
+        "2023-04",
+        "--attribution",
+        str(attribution_file),
+    ]
+
+    result = subprocess.run(command, capture_output=True, text=True, check=False)
+
+    assert result.returncode == 0, f"CLI command failed with stderr: {result.stderr}"
+    with open(attribution_file, 'r') as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 4
+    assert records[0]["partner_id"] == 1
+    assert records[0]["commission"] == pytest.approx(20.0, abs=1e-2)
+
+def test_batch_cli_rejects_non_positive_workers(tmp_path):
+    """
+    Tests that the batch CLI rejects --workers values below 1 as a usage error.
+    """
+    command = [
+        sys.executable,
+        "batch.py",
+        "--manifest",
+        str(tmp_path / "manifest.json"),
+        "--summary",
+        str(tmp_path / "summary.json"),
+        "--workers",
+        "0",
+    ]
+
+    result = subprocess.run(command, capture_output=True, text=True, check=False)
+
+    assert result.returncode == 2
+    assert "must be at least 1" in result.stderr
+    assert "Traceback" not in result.stderr
+
+def test_events_cli_rejects_non_positive_checkpoint_interval(tmp_path):
+    """
+    Tests that the events CLI rejects --checkpoint-interval values below 1 as a usage error.
+    """
+    command = [
+        sys.executable,
+        "events.py",
+        "--log",
+        str(tmp_path / "events.ndjson"),
+        "--checkpoint",
+        str(tmp_path / "checkpoint.json"),
+        "--output",
+        str(tmp_path / "commissions.json"),
+        "--checkpoint-interval",
+        "0",
+    ]
+
+    result = subprocess.run(command, capture_output=True, text=True, check=False)
+
+    assert result.returncode == 2
+    assert "must be at least 1" in result.stderr
+    assert "Traceback" not in result.stderr
+
+def test_events_cli_reports_malformed_checkpoint(tmp_path):
+    """
+    Tests that the events CLI reports a wrongly shaped checkpoint without a traceback.
+    """
+    checkpoint_file = tmp_path / "checkpoint.json"
+    checkpoint_file.write_text('[[1, null, "a"]]')
+    command = [
+        sys.executable,
+        "events.py",
+        "--log",
+        str(tmp_path / "events.ndjson"),
+        "--checkpoint",
+        str(checkpoint_file),
+        "--output",
+        str(tmp_path / "commissions.json"),
+    ]
+
+    result = subprocess.run(command, capture_output=True, text=True, check=False)
+
+    assert result.returncode == 1
+    assert "Malformed checkpoint" in result.stderr
+    assert "Traceback" not in result.stderr
@@ -0,0 +1,174 @@
+"""
+Tests for the scenarios module.
+"""
+import pytest
+from dataclasses import replace
+from src.data_loader import Partner
+from src import scenarios
+from src.commission_engine import CommissionCalculator, RankTier, differential_leg
+from src.scenarios import Scenario, evaluate_scenarios
+
+DAYS_IN_MONTH = 30
+
+RANK_TIERS = [RankTier(0, 0.03), RankTier(5000, 0.05), RankTier(10000, 0.07)]
+
+def expected_deltas(partners, modified_partners, **plan):
+    """Computes deltas by running the full calculation on both hierarchies."""
+    baseline = CommissionCalculator(partners, DAYS_IN_MONTH, **plan).calculate_commissions()
+    modified = CommissionCalculator(modified_partners, DAYS_IN_MONTH, **plan).calculate_commissions()
+    deltas = {pid: round(modified[pid] - baseline[pid], 2) for pid in baseline}
+    return {pid: d for pid, d in deltas.items() if d}
+
+def test_sponsor_change_matches_full_recalculation(happy_path_partners):
+    """
+    Tests that moving a subtree gives the same deltas as recalculating from scratch.
+    """
+    calculator = CommissionCalculator(happy_path_partners, DAYS_IN_MONTH)
+    [result] = evaluate_scenarios(calculator, [Scenario("move", sponsor_changes={2: 3})], max_workers=1)
+
+    modified = [replace(p, parent_id=3) if p.id == 2 else p for p in happy_path_partners]
+    assert result.error is None
+    assert result.deltas == expected_deltas(happy_path_partners, modified)
+    # Partner 1's downline is unchanged, so only the new sponsor's commission moves.
+    assert set(result.deltas) == {3}
+
+def test_revenue_override_only_touches_ancestors(happy_path_partners):
+    """
+    Tests that a revenue change produces deltas for the partner's uplines only.
+    """
+    calculator = CommissionCalculator(happy_path_partners, DAYS_IN_MONTH)
+    [result] = evaluate_scenarios(calculator, [Scenario("boost", revenue_overrides={4: 5000})], max_workers=1)
+
+    modified = [replace(p, monthly_revenue=5000) if p.id == 4 else p for p in happy_path_partners]
+    assert result.deltas == expected_deltas(happy_path_partners, modified)
+    assert set(result.deltas) == {1, 2}
+    assert result.total_delta == pytest.approx(sum(result.deltas.values()), abs=1e-2)
+
+def test_rate_change_affects_all_earning_partners(happy_path_partners):
+    """
+    Tests that a rate change is applied across the whole hierarchy.
+    """
+    calculator = CommissionCalculator(happy_path_partners, DAYS_IN_MONTH)
+    [result] = evaluate_scenarios(calculator, [Scenario("rate", commission_rate=0.1)], max_workers=1)
+
+    assert result.deltas == {1: 20.0, 2: 3.34}
+
+def test_invalid_scenarios_report_errors(happy_path_partners):
+    """
+    Tests that cycles and unknown partners are reported per scenario.
+    """
+    calculator = CommissionCalculator(happy_path_partners, DAYS_IN_MONTH)
+    cycle, unknown, valid = evaluate_scenarios(calculator, [
+        Scenario("cycle", sponsor_changes={1: 4}),
+        Scenario("unknown", revenue_overrides={99: 100}),
+        Scenario("valid", revenue_overrides={3: 0}),
+    ], max_workers=1)
+
+    assert "cycle" in cycle.error
+    assert "Unknown partner" in unknown.error
+    assert valid.error is None
+    assert valid.deltas == {1: -8.33}
+
+def test_parallel_evaluation_matches_serial(happy_path_partners):
+    """
+    Tests that evaluating on a process pool gives the same results in the same order.
+    """
+    calculator = CommissionCalculator(happy_path_partners, DAYS_IN_MONTH)
+    scenarios = [
+        Scenario("move", sponsor_changes={4: None}),
+        Scenario("boost", revenue_overrides={2: 9000}),
+        Scenario("combined", sponsor_changes={3: 2}, revenue_overrides={4: 0}, commission_rate=0.07),
+    ]
+
+    assert evaluate_scenarios(calculator, scenarios, max_workers=2) == evaluate_scenarios(
+        calculator, scenarios, max_workers=1
+    )
+
+def test_combined_scenario_matches_full_recalculation():
+    """
+    Tests several simultaneous moves and revenue changes in a deeper hierarchy.
+    """
+    partners = [Partner(1, None, "P1", 1000)] + [
+        Partner(i, (i - 2) // 2 + 1, f"P{i}", 100 * i) for i in range(2, 32)
+    ]
+    calculator = CommissionCalculator(partners, DAYS_IN_MONTH)
+    scenario = Scenario(
+        "reshuffle",
+        sponsor_changes={5: 30, 3: None},
+        revenue_overrides={31: 0, 8: 12345},
+    )
+    [result] = evaluate_scenarios(calculator, [scenario], max_workers=1)
+
+    modified = []
+    for p in partners:
+        if p.id in scenario.sponsor_changes:
+            p = replace(p, parent_id=scenario.sponsor_changes[p.id])
+        if p.id in scenario.revenue_overrides:
+            p = replace(p, monthly_revenue=scenario.revenue_overrides[p.id])
+        modified.append(p)
+    assert result.deltas == expected_deltas(partners, modified)
+
+@pytest.mark.parametrize("differential", [False, True])
+def test_ranked_plan_scenarios_match_full_recalculation(happy_path_partners, differential):
+    """
+    Tests scenarios against volume-tiered plans, with and without differential payouts.
+    """
+    plan = {"rank_tiers": RANK_TIERS, "differential": differential}
+    calculator = CommissionCalculator(happy_path_partners, DAYS_IN_MONTH, **plan)
+    scenario = Scenario("move", sponsor_changes={4: 3}, revenue_overrides={3: 9000})
+    [result] = evaluate_scenarios(calculator, [scenario], max_workers=1)
+
+    modified = [
+        replace(p, parent_id=3) if p.id == 4 else replace(p, monthly_revenue=9000) if p.id == 3 else p
+        for p in happy_path_partners
+    ]
+    assert result.error is None
+    assert result.deltas == expected_deltas(happy_path_partners, modified, **plan)
+    assert result.deltas
+
+def test_rate_override_rejected_for_ranked_plan(happy_path_partners):
+    """
+    Tests that a flat rate override is reported as an error for a ranked plan.
+    """
+    calculator = CommissionCalculator(happy_path_partners, DAYS_IN_MONTH, RANK_TIERS)
+    [result] = evaluate_scenarios(calculator, [Scenario("rate", commission_rate=0.1)], max_workers=1)
+
+    assert "ranked plan" in result.error
+
+def test_revenue_override_sums_totals_in_engine_order():
+    """
+    Tests that affected totals add floats in the engine's order, so no spurious cent appears.
+    """
+    partners = [
+        Partner(1, None, "P1", 59.55),
+        Partner(2, 1, "P2", 60.63),
+        Partner(3, 2, "P3", 24.29),
+        Partner(4, 2, "P4", 40.31),
+        Partner(5, 4, "P5", 26.93),
+        Partner(6, 3, "P6", 37.26),
+    ]
+    calculator = CommissionCalculator(partners, DAYS_IN_MONTH)
+    [result] = evaluate_scenarios(calculator, [Scenario("cut", revenue_overrides={2: 0.21})], max_workers=1)
+
+    modified = [replace(p, monthly_revenue=0.21) if p.id == 2 else p for p in partners]
+    assert result.deltas == expected_deltas(partners, modified) == {1: -0.11}
+
+def test_differential_scenario_only_recomputes_affected_partners(monkeypatch):
+    """
+    Tests that differential payouts are recomputed for the changed partner's uplines only.
+    """
+    partners = [Partner(1, None, "P1", 1000)] + [
+        Partner(i, (i - 2) // 3 + 1, f"P{i}", 250 * (i % 9)) for i in range(2, 200)
+    ]
+    calculator = CommissionCalculator(partners, DAYS_IN_MONTH, RANK_TIERS, differential=True)
+    legs_paid = []
+    monkeypatch.setattr(scenarios, "differential_leg", lambda *args: legs_paid.append(args[2]) or differential_leg(*args))
+    scenario = Scenario("boost", revenue_overrides={150: 20000})
+    [result] = evaluate_scenarios(calculator, [scenario], max_workers=1)
+
+    modified = [replace(p, monthly_revenue=20000) if p.id == 150 else p for p in partners]
+    plan = {"rank_tiers": RANK_TIERS, "differential": True}
+    assert result.deltas == expected_deltas(partners, modified, **plan)
+    assert result.deltas
+    # Partner 150 has no downline; its uplines 50, 17, 6, 2 and 1 have three children each.
+    assert len(legs_paid) == 5 * 3
@@ -3,6 +3,7 @@ Tests for the tree_validator module.
 """
 import pytest
 from src.data_loader import Partner
+from src.commission_engine import CommissionCalculator
 from src.tree_validator import validate_hierarchy
 
 @pytest.fixture
@@ -61,3 +62,46 @@ def test_validate_hierarchy_self_referential_cycle(self_referential_partner_data
     partners = [Partner(**p) for p in self_referential_partner_data]
     with pytest.raises(ValueError, match="Cycle detected"):
         validate_hierarchy(partners)
+
+def test_validate_hierarchy_duplicate_id():
+    """
+    Tests that a ValueError is raised when two partners share an id.
+    """
+    partners = [
+        Partner(id="a", parent_id=None, name="Partner1", monthly_revenue=10000),
+        Partner(id="a", parent_id=None, name="Partner2", monthly_revenue=5000),
+    ]
+    with pytest.raises(ValueError, match="Duplicate partner id"):
+        validate_hierarchy(partners)
+
+def test_validate_hierarchy_reports_string_id_cycle(cyclic_partners_data):
+    """
+    Tests that the cycle path is reported with the external ids.
+    """
+    partners = [
+        Partner(id=f"id-{p['id']}", parent_id=f"id-{p['parent_id']}", name=p['name'], monthly_revenue=p['monthly_revenue'])
+        for p in cyclic_partners_data
+    ]
+    with pytest.raises(ValueError, match="Cycle detected in the hierarchy: id-2 -> id-3 -> id-1 -> id-2"):
+        validate_hierarchy(partners)
+
+def test_validate_hierarchy_very_deep_chain():
+    """
+    Tests that a chain deeper than the recursion limit is validated.
+    """
+    partners = [Partner(id=1, parent_id=None, name="P1", monthly_revenue=1)] + [
+        Partner(id=i, parent_id=i - 1, name=f"P{i}", monthly_revenue=1) for i in range(2, 5001)
+    ]
+    validate_hierarchy(partners)
+
+def test_validate_hierarchy_returns_reusable_index(happy_path_partners):
+    """
+    Tests that the codec and parents built by the validator are reused by the calculator.
+    """
+    codec, parents = validate_hierarchy(happy_path_partners)
+
+    calculator = CommissionCalculator(happy_path_partners, 30, hierarchy=(codec, parents))
+
+    assert calculator.codec is codec
+    assert calculator.parents is parents
+    assert calculator.calculate_commissions() == CommissionCalculator(happy_path_partners, 30).calculate_commissions()